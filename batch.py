@@ -0,0 +1,270 @@
+"""
+Batch solver: many instances on a process pool, results streamed out.
+
+Instances come from a directory (every .graph / .tsp file in it) or from
+a JSON-lines file ("-" for stdin) with one job per line:
+
+    {"id": "a", "path": "berlin52.tsp"}
+    {"id": "b", "coordinates": [[0, 0], [3, 4], ...], "seed": 7}
+    {"id": "c", "matrix": [[0, 5, ...], [5, 0, ...], ...]}
+    {"id": "d", "nodes": 500, "seed": 3}
+
+coordinates (+ seed) use the usual time-cost model, matrix is a full
+n x n weight matrix without padding, nodes (+ seed) generates a random
+instance. Any job may also set "algorithm" and "timeout". Otherwise
+choose_algorithm picks one by size.
+
+Every result is printed as one JSON line as soon as its job finishes
+(in completion order), followed by a summary with the throughput.
+
+    python3 batch.py instances/ --workers 8 --timeout 5 > results.jsonl
+    python3 batch.py jobs.jsonl --no-tours
+
+Timeouts are enforced through the solvers' time budgets (see budget.py):
+a job whose solver runs out returns its best tour so far with
+"timed_out": true. Loading the instance does not count against it.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from budget import Budget
+from christofides_v1 import christofides_with_stats
+from graph_io import load_any
+from heldkarp import HELD_KARP_LIMIT, held_karp_with_stats
+from lazyGraph import LazyWeightedGraph
+from nn_2opt import nn_search, tour_cost, two_opt
+from randomGraph import randomWeightedCompleteBulk
+from result_cache import ResultCache, cached_solve
+from tour import Tour
+from weightedGraph import WeightedGraph
+
+# choose_algorithm picks exact Held-Karp up to this many nodes, NN + 2-opt
+# up to NN_TWO_OPT_LIMIT, Christofides above
+BATCH_EXACT_LIMIT = 16
+NN_TWO_OPT_LIMIT = 1000
+
+# Starts tried by nn_search
+NN_STARTS = 10
+
+# Default per-job budget in seconds
+JOB_TIMEOUT = 10.0
+
+# Jobs submitted but not finished, per worker; bounds memory when the
+# input is a long stream
+JOBS_IN_FLIGHT = 2
+
+# Files picked up from an input directory
+INSTANCE_SUFFIXES = (".graph", ".tsp")
+
+# Coordinate instances above this size are solved on a lazy graph
+LAZY_FROM = 5000
+
+# ---------------------------
+# Jobs
+# ---------------------------
+def choose_algorithm(n):
+    if n <= BATCH_EXACT_LIMIT:
+        return "held_karp"
+    if n <= NN_TWO_OPT_LIMIT:
+        return "nn_two_opt"
+    return "christofides"
+
+def load_instance(job):
+    """The graph a job describes."""
+    if "path" in job:
+        return load_any(job["path"])
+    if "matrix" in job:
+        D = np.asarray(job["matrix"], dtype=np.float64)
+        W = np.zeros((len(D) + 1, len(D) + 1))
+        W[1:, 1:] = D
+        return WeightedGraph.from_array(W)
+    if "coordinates" in job:
+        xy = np.asarray(job["coordinates"], dtype=np.float64).reshape(-1, 2)
+        lazy = LazyWeightedGraph(xy, seed=job.get("seed", 1))
+        if len(xy) >= LAZY_FROM:
+            return lazy
+        return WeightedGraph.from_array(lazy.materialize(), lazy.coordinates)
+    if "nodes" in job:
+        return randomWeightedCompleteBulk(job["nodes"], seed=job.get("seed", 1))
+    raise ValueError("job needs one of path, matrix, coordinates or nodes")
+
+def solve(graph, algorithm, timeout, seed=1, incumbent=None):
+    """
+    Run one algorithm under a time budget; returns (tour, cost, optimal,
+    timed_out). timed_out says the solver itself ran out of time and
+    returned its best tour so far (for Held-Karp: did not prove it optimal).
+    incumbent (a known optimal tour, e.g. from the result cache) is
+    returned instead, marked optimal, when the algorithm cannot beat it;
+    NN + 2-opt starts from it when it is better than the NN tour.
+    Held-Karp above HELD_KARP_LIMIT nodes would not fit in memory, so it
+    raises ValueError unless there is an incumbent to return.
+    """
+    n = graph.num_nodes
+    budget = Budget(timeout, solver=algorithm)
+    if algorithm == "held_karp":
+        if n > HELD_KARP_LIMIT:
+            if incumbent is not None:
+                return Tour(incumbent, n), tour_cost(graph, incumbent), True, False
+            raise ValueError(f"held_karp supports at most {HELD_KARP_LIMIT} nodes, got {n}; "
+                             "use nn_two_opt or christofides")
+        cost, tour, info = held_karp_with_stats(n, graph.as_array(), time_budget=timeout,
+                                                incumbent=incumbent)
+        return tour, cost, info["optimal"], not info["optimal"]
+    if algorithm == "nn_two_opt":
+        random.seed(seed)  # nn_search samples its start nodes
+        path, cost = nn_search(graph, start_nodes=min(NN_STARTS, n), budget=budget)
+        if incumbent is not None and tour_cost(graph, incumbent) < cost:
+            path = Tour(incumbent, n)
+        tour = two_opt(graph, path, budget=budget)
+        return better_of(graph, tour, tour_cost(graph, tour), incumbent) + (budget.expired(),)
+    if algorithm == "christofides":
+        tour, cost, _ = christofides_with_stats(graph, budget=budget)
+        return better_of(graph, tour, cost, incumbent) + (budget.expired(),)
+    raise ValueError(f"Unknown algorithm: {algorithm}")
+
+def better_of(graph, tour, cost, incumbent):
+    """
+    (tour, cost, optimal) of the cheaper of tour and incumbent. The
+    incumbent is a known optimum, so it wins ties and comes back optimal.
+    """
+    if incumbent is not None:
+        incumbent_cost = tour_cost(graph, incumbent)
+        if incumbent_cost <= cost:
+            return Tour(incumbent, graph.num_nodes), incumbent_cost, True
+    return tour, cost, False
+
+def run_job(job, timeout=JOB_TIMEOUT, tours=True, cache_dir=None):
+    """
+    Load and solve one job (in a pool worker). Never raises: failures come
+    back as {"id", "error"}. With cache_dir, results go through a
+    result_cache.ResultCache there ("cache" in the result says how).
+    """
+    started = time.perf_counter()
+    result = {"id": job.get("id")}
+    try:
+        graph = load_instance(job)
+        n = graph.num_nodes
+        algorithm = job.get("algorithm") or choose_algorithm(n)
+        budget = job.get("timeout", timeout)
+        seed = job.get("seed", 1)
+        if cache_dir is None:
+            tour, cost, optimal, timed_out = solve(graph, algorithm, budget, seed)
+        else:
+            def run(incumbent):
+                tour, cost, optimal, timed_out = solve(graph, algorithm, budget, seed, incumbent)
+                return {"cost": float(cost), "tour": [int(v) for v in tour], "optimal": optimal,
+                        "timed_out": timed_out}
+
+            params = {"timeout": budget, "seed": seed}
+            stored, result["cache"] = cached_solve(ResultCache(cache_dir), graph, algorithm, params, run)
+            tour, cost, optimal = stored["tour"], stored["cost"], stored["optimal"]
+            timed_out = stored.get("timed_out", False)
+        result.update({
+            "nodes": n,
+            "algorithm": algorithm,
+            "cost": float(cost),
+            "optimal": optimal,
+            "time": time.perf_counter() - started,
+            "timed_out": timed_out,
+            "pid": os.getpid(),
+        })
+        if tours:
+            result["tour"] = [int(v) for v in tour]
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["time"] = time.perf_counter() - started
+    return result
+
+# ---------------------------
+# Input
+# ---------------------------
+def read_jobs(source):
+    """Yield job dicts from a directory, a JSON-lines file or "-" (stdin)."""
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.endswith(INSTANCE_SUFFIXES):
+                yield {"id": name, "path": os.path.join(source, name)}
+        return
+
+    f = sys.stdin if source == "-" else open(source)
+    try:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if line:
+                job = json.loads(line)
+                job.setdefault("id", number)
+                yield job
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+# ---------------------------
+# Scheduling
+# ---------------------------
+def run_batch(jobs, workers=None, timeout=JOB_TIMEOUT, tours=True, cache_dir=None):
+    """
+    Solve every job on a pool of `workers` processes (workers=1 solves in
+    this process). Yields result dicts in completion order. At most
+    JOBS_IN_FLIGHT jobs per worker are pending at a time, so `jobs` can
+    be an endless iterator.
+    """
+    workers = workers or os.cpu_count() or 1
+    jobs = iter(jobs)
+    if workers <= 1:
+        for job in jobs:
+            yield run_job(job, timeout, tours, cache_dir)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < JOBS_IN_FLIGHT * workers:
+                job = next(jobs, None)
+                if job is None:
+                    exhausted = True
+                else:
+                    pending.add(pool.submit(run_job, job, timeout, tours, cache_dir))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve a batch of TSP instances on a process pool.")
+    parser.add_argument("source", help="directory of .graph / .tsp files, a JSON-lines file, or - for stdin")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=JOB_TIMEOUT,
+                        help="per-job budget in seconds")
+    parser.add_argument("--no-tours", action="store_true", help="leave the tours out of the results")
+    parser.add_argument("--out", help="write the results here instead of stdout")
+    parser.add_argument("--cache", help="result cache directory (see result_cache.py)")
+    args = parser.parse_args()
+
+    out = open(args.out, "w") if args.out else sys.stdout
+    started = time.perf_counter()
+    solved = failed = 0
+    for result in run_batch(read_jobs(args.source), args.workers, args.timeout, not args.no_tours,
+                            args.cache):
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+        if "error" in result:
+            failed += 1
+        else:
+            solved += 1
+    elapsed = time.perf_counter() - started
+    if out is not sys.stdout:
+        out.close()
+
+    rate = (solved + failed) / elapsed if elapsed > 0 else 0.0
+    print(f"{solved} solved, {failed} failed in {elapsed:.2f}s ({rate:.2f} instances/s)", file=sys.stderr)
@@ -0,0 +1,223 @@
+"""
+Non-interactive benchmark runner.
+
+Sweeps node counts, seeds and algorithms on randomWeightedCompleteBulk
+instances, repeats every run and records min / median wall time, tour
+cost and the gap to a reference: the Held-Karp optimum when Held-Karp
+ran on that instance, otherwise the 1-tree lower bound.
+
+    python3 benchmark.py -n 10,15,20 --seeds 1,2,3 --json results.json
+    python3 benchmark.py -n 10,15,20 --seeds 1,2,3 --baseline results.json
+
+With --baseline, every (algorithm, nodes, seed) row is compared with the
+stored results; slower median times (beyond --time-tolerance) and higher
+costs are reported as regressions and the exit status is 1.
+"""
+
+import argparse
+import csv
+import json
+import random
+import statistics
+import sys
+import time
+
+from christofides_v1 import christofides
+from heldkarp import HELD_KARP_LIMIT, held_karp
+from local_search import local_search
+from lower_bound import held_karp_bound
+from nn_2opt import nn_search, two_opt, tour_cost
+from randomGraph import randomWeightedCompleteBulk
+
+# Starts tried by nn_search
+NN_STARTS = 10
+
+# A median time counts as a regression when it is this much slower than
+# the baseline (relative) and by more than MIN_TIME_DELTA seconds
+TIME_TOLERANCE = 0.25
+MIN_TIME_DELTA = 0.01
+
+# Costs closer than this are treated as equal
+COST_EPS = 1e-6
+
+# Gaps (in percent) down to -GAP_TOLERANCE are float noise and count as 0;
+# anything lower means a solver beat the optimum or the bound is wrong
+GAP_TOLERANCE = 1e-6
+
+FIELDS = ("algorithm", "nodes", "seed", "repeats", "min_time", "median_time",
+          "cost", "gap", "reference")
+
+# ---------------------------
+# Algorithms
+# ---------------------------
+def run_christofides(g, seed):
+    _, cost = christofides(g)
+    return cost
+
+def run_nn_two_opt(g, seed):
+    random.seed(seed)  # nn_search samples its start nodes
+    path, _ = nn_search(g, start_nodes=min(NN_STARTS, g.num_nodes))
+    return tour_cost(g, two_opt(g, path))
+
+def run_local_search(g, seed):
+    random.seed(seed)
+    path, _ = nn_search(g, start_nodes=min(NN_STARTS, g.num_nodes))
+    improved, _ = local_search(g, two_opt(g, path))
+    return tour_cost(g, improved)
+
+def run_held_karp(g, seed):
+    if g.num_nodes > HELD_KARP_LIMIT:
+        return None
+    cost, _ = held_karp(g.num_nodes, g.adj_matrix)
+    return cost
+
+# Each runner takes (graph, seed) and returns the tour cost, or None when
+# the algorithm does not run at that size
+ALGORITHMS = {
+    "christofides": run_christofides,
+    "nn_two_opt": run_nn_two_opt,
+    "local_search": run_local_search,
+    "held_karp": run_held_karp,
+}
+
+# ---------------------------
+# Sweep
+# ---------------------------
+def time_runs(runner, g, seed, repeats):
+    """Run repeats times; returns (cost, list of wall times)."""
+    times = []
+    cost = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        cost = runner(g, seed)
+        times.append(time.perf_counter() - start)
+        if cost is None:
+            return None, times
+    return cost, times
+
+def benchmark(nodes, seeds, algorithms=tuple(ALGORITHMS), repeats=3, progress=None):
+    """
+    Run every algorithm on every (nodes, seed) instance.
+    Returns a list of row dicts with the keys in FIELDS; algorithms that
+    skip an instance are left out. progress(row) is called per row.
+    """
+    for name in algorithms:
+        if name not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm: {name}")
+
+    rows = []
+    for n in nodes:
+        for seed in seeds:
+            g = randomWeightedCompleteBulk(n, seed=seed)
+            instance = []
+            for name in algorithms:
+                cost, times = time_runs(ALGORITHMS[name], g, seed, repeats)
+                if cost is None:
+                    continue
+                instance.append({
+                    "algorithm": name,
+                    "nodes": n,
+                    "seed": seed,
+                    "repeats": repeats,
+                    "min_time": min(times),
+                    "median_time": statistics.median(times),
+                    "cost": float(cost),
+                })
+
+            # Gap against the optimum when known, else the lower bound
+            optimum = [row["cost"] for row in instance if row["algorithm"] == "held_karp"]
+            if optimum:
+                reference, kind = optimum[0], "optimal"
+            elif instance:
+                reference, _ = held_karp_bound(g, min(row["cost"] for row in instance))
+                kind = "lower_bound"
+            for row in instance:
+                gap = (row["cost"] - reference) / reference * 100 if reference > 0 else 0.0
+                if gap < -GAP_TOLERANCE:
+                    raise ValueError(f"{row['algorithm']} n={n} seed={seed}: cost {row['cost']:.6f} "
+                                     f"is below the {kind} reference {reference:.6f}")
+                row["gap"] = max(gap, 0.0)
+                row["reference"] = kind
+                if progress is not None:
+                    progress(row)
+            rows.extend(instance)
+    return rows
+
+# ---------------------------
+# Output and baselines
+# ---------------------------
+def write_csv(rows, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def write_json(rows, path):
+    with open(path, "w") as f:
+        json.dump(rows, f, indent=2)
+
+def load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+def find_regressions(rows, baseline, time_tolerance=TIME_TOLERANCE):
+    """
+    Compare rows with baseline rows of the same (algorithm, nodes, seed).
+    Returns a list of human-readable regression messages.
+    """
+    known = {(b["algorithm"], b["nodes"], b["seed"]): b for b in baseline}
+    regressions = []
+    for row in rows:
+        key = (row["algorithm"], row["nodes"], row["seed"])
+        base = known.get(key)
+        if base is None:
+            continue
+        label = f"{key[0]} n={key[1]} seed={key[2]}"
+
+        slower = row["median_time"] - base["median_time"]
+        if slower > MIN_TIME_DELTA and row["median_time"] > base["median_time"] * (1 + time_tolerance):
+            regressions.append(f"{label}: median time {base['median_time']:.4f}s -> {row['median_time']:.4f}s")
+        if row["cost"] > base["cost"] + COST_EPS:
+            regressions.append(f"{label}: cost {base['cost']:.4f} -> {row['cost']:.4f}")
+    return regressions
+
+def int_list(text):
+    return [int(x) for x in text.split(",") if x]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the TSP solvers without prompts.")
+    parser.add_argument("-n", "--nodes", type=int_list, default=[10, 15, 20],
+                        help="comma separated node counts")
+    parser.add_argument("--seeds", type=int_list, default=[1, 2, 3])
+    parser.add_argument("--algorithms", default=",".join(ALGORITHMS),
+                        help="comma separated, any of " + ", ".join(ALGORITHMS))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--csv", help="write the results as CSV")
+    parser.add_argument("--json", help="write the results as JSON (usable as a baseline)")
+    parser.add_argument("--baseline", help="JSON results to check for regressions against")
+    parser.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE)
+    args = parser.parse_args()
+
+    print(f"{'Algorithm':14} {'Nodes':>6} {'Seed':>5} {'Min (s)':>10} {'Median (s)':>11} "
+          f"{'Cost':>11} {'Gap':>8}  Reference")
+
+    def show(row):
+        print(f"{row['algorithm']:14} {row['nodes']:6} {row['seed']:5} {row['min_time']:10.4f} "
+              f"{row['median_time']:11.4f} {row['cost']:11.4f} {row['gap']:7.2f}%  {row['reference']}")
+
+    rows = benchmark(args.nodes, args.seeds, args.algorithms.split(","), args.repeats, show)
+
+    if args.csv:
+        write_csv(rows, args.csv)
+    if args.json:
+        write_json(rows, args.json)
+
+    if args.baseline:
+        regressions = find_regressions(rows, load_json(args.baseline), args.time_tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for message in regressions:
+                print(f"  {message}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline}")
@@ -0,0 +1,175 @@
+import argparse
+import time
+
+import numpy as np
+
+import profiling
+from lower_bound import held_karp_bound
+from prims import Prim, mst_weight
+from weightedGraph import WeightedGraph
+from nn_2opt import nn_search, two_opt, tour_cost
+from randomGraph import randomWeightedCompleteBulk
+from tour import Tour
+
+# Costs closer than this are treated as equal
+EPS = 1e-9
+
+# How many search nodes to expand between two clock checks
+CLOCK_EVERY = 256
+
+
+class BudgetExceeded(Exception):
+    """Raised inside the search when the node or time budget runs out."""
+
+
+def completion_bound(graph, start, last, remaining):
+    """
+    Lower bound on the cheapest path last -> (all of remaining) -> start.
+
+    Dropping the two end edges of such a path leaves a spanning path of
+    `remaining`, which costs at least its MST; the end edges cost at least
+    the cheapest edge from `last` and from `start` into `remaining`.
+    When nothing has been visited yet (last == start) this is the 1-tree
+    bound: MST of the other vertices plus the two cheapest edges at start.
+    """
+    w = graph.adj_matrix
+    tree = mst_weight(graph, Prim(graph, remaining))
+
+    if last == start:
+        two_cheapest = sorted(w[start][v] for v in remaining)[:2]
+        return tree + sum(two_cheapest)
+
+    return tree + min(w[last][v] for v in remaining) + min(w[start][v] for v in remaining)
+
+
+def penalized_graph(graph, pi):
+    """
+    Copy of graph with weights w[u][v] + pi[u] + pi[v] + shift.
+
+    Every tour picks up exactly 2 * sum(pi) + n * shift, and so does every
+    completion_bound (a completion through r vertices and its bound both use
+    r + 1 edges), so pruning on this graph is as valid as on the original.
+    shift keeps all weights positive, since Prim treats 0 as "no edge".
+    pi is indexed by vertex label (pi[0] unused).
+    Returns (penalized graph, offset added to every tour).
+    """
+    n = graph.num_nodes
+    D = graph.as_array()[1:, 1:]
+    W = D + pi[1:, None] + pi[None, 1:]
+    np.fill_diagonal(W, np.inf)
+    shift = max(0.0, -float(W.min())) + 1.0
+    W += shift
+    np.fill_diagonal(W, 0.0)
+
+    pg = WeightedGraph(n, dtype=np.float64, coordinates=graph.coordinates)
+    pg.adj_matrix[1:, 1:] = W
+    return pg, 2.0 * float(pi[1:].sum()) + n * shift
+
+
+def branch_and_bound(graph, node_budget=1_000_000, time_budget=10.0, start_nodes=10):
+    """
+    Exact TSP by depth-first branch-and-bound.
+
+    - Incumbent: best nn_search tour improved by two_opt
+    - Partial tours start at vertex 1 and are extended nearest-first
+    - A partial tour is pruned once its cost plus completion_bound
+      (MST / 1-tree, built with prims.Prim) reaches the incumbent
+
+    Stops early once node_budget search nodes were expanded or time_budget
+    seconds passed (None disables either budget).
+    Returns (cost, tour, info): tour is a Tour starting at vertex 1 and
+    info = {"optimal": bool, "nodes": int, "time": float}. "optimal" is
+    True only when the search finished inside its budgets.
+    """
+    with profiling.span("branch_and_bound"):
+        n = graph.num_nodes
+        original = graph
+        start = 1
+        started = time.perf_counter()
+        deadline = None if time_budget is None else started + time_budget
+
+        # Initial incumbent from the heuristics
+        with profiling.span("incumbent"):
+            nn_path, _ = nn_search(graph, start_nodes=min(start_nodes, n))
+            incumbent = two_opt(graph, nn_path)
+        best_cost = tour_cost(graph, incumbent)
+        i = incumbent.index(start)
+        best_path = incumbent[i:] + incumbent[:i]
+
+        # Tighten the bounds with 1-tree penalties and search the penalized
+        # graph instead; tour costs there are shifted by `offset`
+        root_bound, pi = held_karp_bound(graph, best_cost)
+        if root_bound >= best_cost - EPS:
+            return finish(graph, best_path, True, 0, started)
+        graph, offset = penalized_graph(graph, pi)
+        w = graph.adj_matrix
+        best_cost = best_cost + offset
+
+        expanded = 0
+        path = [start]
+
+        def search(last, path_cost, remaining):
+            nonlocal best_cost, best_path, expanded
+
+            expanded += 1
+            if node_budget is not None and expanded > node_budget:
+                raise BudgetExceeded
+            if deadline is not None and expanded % CLOCK_EVERY == 0 and time.perf_counter() > deadline:
+                raise BudgetExceeded
+
+            if not remaining:
+                total = path_cost + w[last][start]
+                if total < best_cost - EPS:
+                    best_cost = total
+                    best_path = path[:]
+                return
+
+            if path_cost + completion_bound(graph, start, last, remaining) >= best_cost - EPS:
+                return
+
+            for v in sorted(remaining, key=lambda u: w[last][u]):
+                step_cost = path_cost + w[last][v]
+                if step_cost >= best_cost - EPS:
+                    break  # children are sorted, so the rest cost even more
+                remaining.remove(v)
+                path.append(v)
+                search(v, step_cost, remaining)
+                path.pop()
+                remaining.add(v)
+
+        try:
+            with profiling.span("search"):
+                search(start, 0.0, set(range(2, n + 1)))
+            optimal = True
+        except BudgetExceeded:
+            optimal = False
+        profiling.count("branch_and_bound.nodes", expanded)
+
+        return finish(original, best_path, optimal, expanded, started)
+
+
+def finish(graph, best_path, optimal, expanded, started):
+    info = {
+        "optimal": optimal,
+        "nodes": expanded,
+        "time": time.perf_counter() - started,
+    }
+    return float(tour_cost(graph, best_path)), Tour(best_path, graph.num_nodes), info
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exact TSP by branch-and-bound with 1-tree bounds.")
+    parser.add_argument("-n", "--nodes", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--node-budget", type=int, default=1_000_000)
+    parser.add_argument("--time-budget", type=float, default=10.0)
+    args = parser.parse_args()
+
+    g = randomWeightedCompleteBulk(args.nodes, seed=args.seed)
+    cost, path, info = branch_and_bound(g, args.node_budget, args.time_budget)
+
+    print(f"Cost      : {cost}")
+    print(f"Path      : {' → '.join(str(x) for x in path.closed())}")
+    print(f"Optimal   : {info['optimal']}")
+    print(f"Nodes     : {info['nodes']}")
+    print(f"Runtime   : {info['time']:.6f} seconds")
@@ -0,0 +1,56 @@
+"""
+Wall-clock budgets and progress reporting for the anytime solvers.
+
+A solver entry point that takes `time_budget` (seconds, None for no
+limit) and `progress` builds one Budget and hands it to its phases.
+Phases poll budget.expired() between units of work and stop early,
+keeping the best tour they have. Every new incumbent goes through
+budget.improve(cost), which calls
+
+    progress({"solver": name, "time": seconds since the start, "cost": cost})
+
+so a run leaves a convergence curve of (time, cost) points.
+"""
+
+import math
+import time
+
+# Costs closer than this are not reported as an improvement
+EPS = 1e-9
+
+
+class Budget:
+    def __init__(self, time_budget=None, progress=None, solver=""):
+        self.started = time.perf_counter()
+        self.deadline = None if time_budget is None else self.started + time_budget
+        self.progress = progress
+        self.solver = solver
+        self.best = math.inf
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def remaining(self):
+        """Seconds left, or None when there is no limit."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.perf_counter())
+
+    def expired(self):
+        return self.deadline is not None and time.perf_counter() > self.deadline
+
+    def improve(self, cost):
+        """Record cost if it beats the incumbent; returns True when it did."""
+        if cost >= self.best - EPS:
+            return False
+        self.best = cost
+        if self.progress is not None:
+            self.progress({"solver": self.solver, "time": self.elapsed(), "cost": float(cost)})
+        return True
+
+
+def as_budget(time_budget=None, progress=None, solver="", budget=None):
+    """The caller's Budget when one is passed down, else a new one."""
+    if budget is not None:
+        return budget
+    return Budget(time_budget, progress, solver)
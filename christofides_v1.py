@@ -1,6 +1,9 @@
+from budget import as_budget
+from matching import MATCHING_TIME_BUDGET, greedy_matching, matching_weight, min_weight_perfect_matching
 from prims import Prim
-from randomGraph import randomWeightedComplete
-import math
+import profiling
+from tour import Tour
+import argparse
 import time
 
 def get_mst_adj_list(T,n):
@@ -33,38 +36,6 @@ def odd_degree_vertices(T, n):
 
     return odd_degree_list
 
-def greedy_matching(graph, odd_degree_vertices):
-    """
-    Compute a greedy minimum-weight perfect matching on the odd-degree vertices. Returns a list of edges (u,v)
-    """
-
-    # vertices we still need to match 
-    unmatched = set(odd_degree_vertices)
-
-    matching = []
-
-    # There should always be an even number of odd vertices in a graph
-    assert len(unmatched) % 2 == 0, "The number of odd-degree vertices has to be even"
-
-    while unmatched:
-        v = unmatched.pop()     # Take one odd vertex from the list
-        best_u = None           # Best matching vertex
-        best_weight = math.inf
-
-        # Find the nearest neighbor among the remaing unmatched odd vertices
-        for u in unmatched:
-            weight = graph.adj_matrix[v][u]
-            if weight < best_weight:
-                best_weight = weight
-                best_u = u
-
-
-        # Pair v with its nearest neighbor
-        unmatched.remove(best_u)
-        matching.append((v, best_u))
-
-    return matching
-
 def build_multigraph(T, matching, n):
     """
     Build the multigraph used in Christofides:
@@ -85,6 +56,58 @@ def build_multigraph(T, matching, n):
 
     return adj_list
 
+def multigraph_edges(T, matching, n):
+    """
+    The same multigraph as build_multigraph, edge-indexed:
+    returns (edges, incident) where edges[e] = (u, v) and incident[v]
+    lists the ids of the edges at v (multi-edges get separate ids).
+    """
+    edges = [(T[v], v) for v in range(1, n + 1) if T[v] != -1]
+    edges.extend(matching)
+
+    incident = [[] for _ in range(n + 1)]
+    for e, (u, v) in enumerate(edges):
+        incident[u].append(e)
+        incident[v].append(e)
+
+    return edges, incident
+
+def hierholzer(edges, incident, start=1):
+    """
+    Eulerian circuit by Hierholzer's algorithm, iterative.
+
+    Walks unused edges from the vertex on top of the stack until it gets
+    stuck, then pops that vertex onto the circuit. Every vertex keeps a
+    pointer into its incident list, so each edge is looked at O(1) times
+    and the whole circuit takes O(V + E).
+    Assumes every vertex has even degree and the edges are connected.
+    Returns the circuit as a list of vertices starting and ending at start.
+    """
+    used = [False] * len(edges)
+    next_edge = [0] * len(incident)
+
+    stack = [start]
+    circuit = []
+    while stack:
+        v = stack[-1]
+        at_v = incident[v]
+        i = next_edge[v]
+        while i < len(at_v) and used[at_v[i]]:
+            i += 1
+        next_edge[v] = i
+
+        if i == len(at_v):
+            circuit.append(stack.pop())
+            continue
+
+        e = at_v[i]
+        used[e] = True
+        a, b = edges[e]
+        stack.append(b if a == v else a)
+
+    circuit.reverse()
+    return circuit
+
 def dfs_count(v, adj, visited):
     # DFS to count reachable vertices from visted
     visited.add(v)
@@ -125,6 +148,7 @@ def is_bridge(u, v, adj):
 def fleury(multigraph):
     """
     Compute an Eulerian tour using Fleury's algorithm.
+    (Quadratic and recursive; christofides uses hierholzer instead.)
 
     multigraph: dict {vertex: [neighbors...]} (multi-edges allowed)
     Assumes:
@@ -178,11 +202,11 @@ def shortcut_tour(graph, euler_tour):
     build a TSP tour by skipping already-visited vertices
     and compute its total cost using the original graph weights.
 
-    Returns: (tsp_tour, total_cost)
+    Returns: (tsp_tour, total_cost) with tsp_tour a Tour
     """
 
     if not euler_tour:
-        return [], 0.0
+        return Tour(), 0.0
 
     visited = set()
     tsp_tour = []
@@ -203,51 +227,112 @@ def shortcut_tour(graph, euler_tour):
     for i in range(len(tsp_tour) - 1):
         u = tsp_tour[i]
         v = tsp_tour[i + 1]
-        weight = graph.adj_matrix[u][v]
+        weight = graph.weight(u, v)
         total_cost += weight
 
     total_cost = round(total_cost, 2)
 
-    return tsp_tour, total_cost
+    # The Tour does not repeat the start vertex
+    cycle = tsp_tour[:-1] if len(tsp_tour) > 1 else tsp_tour
+    return Tour(cycle, graph.num_nodes), total_cost
 
 
 
 
-def christofides(graph):
+def christofides(graph, matching="blossom", matching_budget=MATCHING_TIME_BUDGET,
+                 time_budget=None, progress=None, mst=None):
+    """Returns (tour, cost); see christofides_with_stats."""
+    tsp_tour, tsp_cost, _ = christofides_with_stats(graph, matching, matching_budget,
+                                                    time_budget, progress, mst=mst)
+    return tsp_tour, tsp_cost
+
+def christofides_with_stats(graph, matching="blossom", matching_budget=MATCHING_TIME_BUDGET,
+                            time_budget=None, progress=None, budget=None, mst=None):
+    """
+    Christofides with the matching step chosen by `matching`:
+    "blossom" (minimum-weight perfect matching, greedy after
+    matching_budget seconds) or "greedy".
+
+    time_budget (seconds) caps the whole run. Only the matching can run
+    long, so it gets whatever the budget has left (greedy pairing once it
+    is gone); the other steps always finish. progress receives the final
+    cost (see budget.py). mst is a Prim parent array of graph to reuse
+    (e.g. a cached one); it is computed when None.
+    Returns (tour, cost, stats) with stats = {"matching", "matching_time",
+    "matching_weight", "time"}.
+    """
+    budget = as_budget(time_budget, progress, "christofides", budget)
+    started = time.perf_counter()
 
     # Number of nodes in the graph
     n = graph.num_nodes
 
-    # Step 1: MST
-    mst = Prim(graph)
-
-    # Step 2: find odd-degree vertices in the MST
-    odd_degrees = odd_degree_vertices(mst, n)
-
-    # Step 3: find a minimum-weight perfect matching in the subgraph
-    matching = greedy_matching(graph, odd_degrees)
- 
-    #step 4: Build multigraph = MST + matching edges
-    multigraph = build_multigraph(mst, matching, n)
-
-    # Step 5: Eulerian tour using Fleury
-    euler = fleury(multigraph)
-
-    # Step 6: shortcut Euler tour to TSP tour
-    tsp_tour, tsp_cost = shortcut_tour(graph, euler)
-
-
-    return tsp_tour, tsp_cost
+    with profiling.span("christofides"):
+        # Step 1: MST
+        if mst is None:
+            with profiling.span("prim"):
+                mst = Prim(graph)
+
+        # Step 2: find odd-degree vertices in the MST
+        with profiling.span("odd_vertices"):
+            odd_degrees = odd_degree_vertices(mst, n)
+
+        # Step 3: find a minimum-weight perfect matching in the subgraph
+        with profiling.span("matching"):
+            remaining = budget.remaining()
+            if remaining is not None:
+                matching_budget = remaining if matching_budget is None else min(matching_budget, remaining)
+            if matching == "blossom":
+                pairs, info = min_weight_perfect_matching(graph, odd_degrees, matching_budget)
+            elif matching == "greedy":
+                matching_start = time.perf_counter()
+                pairs = greedy_matching(graph, odd_degrees)
+                info = {"method": "greedy", "time": time.perf_counter() - matching_start,
+                        "weight": matching_weight(graph, pairs)}
+            else:
+                raise ValueError(f"Unknown matching: {matching}")
+
+        #step 4: Build multigraph = MST + matching edges
+        with profiling.span("multigraph"):
+            edges, incident = multigraph_edges(mst, pairs, n)
+
+        # Step 5: Eulerian tour using Hierholzer
+        with profiling.span("euler"):
+            euler = hierholzer(edges, incident)
+
+        # Step 6: shortcut Euler tour to TSP tour
+        with profiling.span("shortcut"):
+            tsp_tour, tsp_cost = shortcut_tour(graph, euler)
+        budget.improve(tsp_cost)
+
+    stats = {
+        "matching": info["method"],
+        "matching_time": info["time"],
+        "matching_weight": info["weight"],
+        "time": time.perf_counter() - started,
+    }
+    return tsp_tour, tsp_cost, stats
 
 
 if __name__ == "__main__":
-
-    g = randomWeightedComplete(10)
-    
-    start = time.time()
-    tour, cost = christofides(g)
-    end = time.time()
-
-    print(f"Christofides runtime: {end - start}, seconds")
-    
-
+    from local_search import local_search
+    from nn_2opt import tour_cost
+    from randomGraph import randomWeightedCompleteBulk
+
+    parser = argparse.ArgumentParser(description="Christofides with greedy vs blossom matching, then local search.")
+    parser.add_argument("-n", "--nodes", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    g = randomWeightedCompleteBulk(args.nodes, seed=args.seed)
+
+    for method in ("greedy", "blossom"):
+        tour, cost, stats = christofides_with_stats(g, method)
+        ls_start = time.perf_counter()
+        improved, _ = local_search(g, tour)
+        ls_time = time.perf_counter() - ls_start
+
+        print(f"--- {method} matching ({stats['matching']}) ---")
+        print(f"Matching weight : {stats['matching_weight']:.2f} ({stats['matching_time']:.4f}s)")
+        print(f"Christofides    : {cost:.2f} ({stats['time']:.4f}s)")
+        print(f"Local search    : {tour_cost(g, improved):.2f} ({ls_time:.4f}s)\n")
@@ -0,0 +1,245 @@
+"""
+Minimum spanning tree kept up to date under edge weight changes.
+
+DynamicMST starts from a Prim parent array T and writes every weight
+change to the graph itself (add_edge, or remove_edge for weight 0), then
+fixes the tree locally instead of running Prim again:
+
+    tree edge gets cheaper / other edge dearer   nothing to do
+    other edge (u, v) gets cheaper               cycle search: the dearest
+                                                 edge on the tree path u..v
+                                                 is swapped out if (u, v)
+                                                 now beats it
+    tree edge (x, T[x]) gets dearer or removed   cut search: the cheapest
+                                                 edge across the cut left
+                                                 by removing it takes its
+                                                 place (may be itself)
+
+A cycle search walks the tree path, and a cut search scans the rows of the
+smaller side of the cut in vectorized blocks. Neither ever rebuilds the
+whole tree. mst.T is a parent array like Prim's, so it can go straight
+to christofides(graph, mst=mst.T).
+
+    mst = DynamicMST(g)
+    mst.update(3, 17, 12.5)
+    tour, cost = christofides(g, mst=mst.T)
+"""
+
+import argparse
+from collections import deque
+import math
+import random
+import time
+
+import numpy as np
+
+from prims import Prim, mst_weight
+from randomGraph import randomWeightedCompleteBulk
+
+# Rows of the weight matrix scanned per block in a cut search
+CUT_BLOCK_ROWS = 1024
+
+
+class DynamicMST:
+    """
+    Parent array T (T[root] == -1) with child sets and depths, over the
+    vertices in nodes (default 1..n). graph must be a WeightedGraph, since
+    updates go through add_edge / remove_edge. When an update disconnects
+    the graph, T becomes a spanning forest (one more vertex with T[v] == -1),
+    as Prim leaves unreachable vertices.
+    """
+
+    def __init__(self, graph, T=None, nodes=None):
+        self.graph = graph
+        n = graph.num_nodes
+        if T is None:
+            T = Prim(graph, nodes)
+        self.T = [int(p) for p in T]
+
+        self.members = np.zeros(n + 1, dtype=bool)
+        if nodes is None:
+            self.members[1:] = True
+        else:
+            self.members[list(nodes)] = True
+
+        self.children = [set() for _ in range(n + 1)]
+        for v, p in enumerate(self.T):
+            if p != -1:
+                self.children[p].add(v)
+        self.depth = [0] * (n + 1)
+        for v in np.flatnonzero(self.members).tolist():
+            if self.T[v] == -1:
+                self._set_depths(v)
+        self.stats = {"updates": 0, "swaps": 0}
+
+    def weight(self):
+        """Total weight of the tree."""
+        return mst_weight(self.graph, self.T)
+
+    def _set_depths(self, root):
+        # Depths of root's subtree, measured from root's own depth
+        queue = deque([root])
+        depth, children = self.depth, self.children
+        while queue:
+            u = queue.popleft()
+            for c in children[u]:
+                depth[c] = depth[u] + 1
+                queue.append(c)
+
+    def _subtree(self, x):
+        """Vertices of x's subtree."""
+        vertices = [x]
+        for u in vertices:
+            vertices.extend(self.children[u])
+        return vertices
+
+    def _reroot(self, a, x, parent):
+        """
+        Make a (inside the subtree of x, which is already cut off) the root
+        of that subtree by turning the path a..x around, then hang it
+        below parent (-1 leaves it a root of its own).
+        """
+        T, children = self.T, self.children
+        u, below = a, parent
+        while True:
+            up = T[u]
+            T[u] = below
+            if below != -1:
+                children[below].add(u)
+            if u == x:
+                break
+            children[up].discard(u)
+            below, u = u, up
+        self.depth[a] = 0 if parent == -1 else self.depth[parent] + 1
+        self._set_depths(a)
+
+# ----------- Updates --------------
+
+    def update(self, u, v, w):
+        """
+        Set the weight of edge (u, v) to w in the graph (0 removes it) and
+        repair the tree.
+        """
+        old = self.graph.weight(u, v)
+        if w == 0:
+            self.graph.remove_edge(u, v)
+        else:
+            self.graph.add_edge(u, v, w)
+        self.stats["updates"] += 1
+        if u == v or not (self.members[u] and self.members[v]):
+            return
+
+        T = self.T
+        if T[u] == v or T[v] == u:
+            if w == 0 or w > old:
+                self._replace_tree_edge(u if T[u] == v else v)
+        elif w != 0 and (old == 0 or w < old):
+            self._try_edge(u, v, w)
+
+    def _try_edge(self, u, v, w):
+        """Cycle search: swap (u, v) in for the dearest edge on the tree path u..v if it is cheaper."""
+        T, depth, weight = self.T, self.depth, self.graph.weight
+        a, b = u, v
+        worst, worst_child, from_u = -math.inf, None, True
+        while a != b:
+            if depth[a] >= depth[b] and T[a] != -1:
+                wa = weight(a, T[a])
+                if wa > worst:
+                    worst, worst_child, from_u = wa, a, True
+                a = T[a]
+            elif T[b] != -1:
+                wb = weight(b, T[b])
+                if wb > worst:
+                    worst, worst_child, from_u = wb, b, False
+                b = T[b]
+            else:
+                # Different trees of the forest: (u, v) joins them
+                self._reroot(u, a, v)
+                self.stats["swaps"] += 1
+                return
+
+        if w < worst:
+            x = worst_child
+            self.children[T[x]].discard(x)
+            T[x] = -1
+            if from_u:
+                self._reroot(u, x, v)
+            else:
+                self._reroot(v, x, u)
+            self.stats["swaps"] += 1
+
+    def _replace_tree_edge(self, x):
+        """Cut search: reconnect x's subtree through the cheapest edge across the cut."""
+        T = self.T
+        y = T[x]
+        self.children[y].discard(x)
+        T[x] = -1
+
+        side = np.zeros(len(T), dtype=bool)
+        side[self._subtree(x)] = True
+        rest = self.members & ~side
+        a, b, best = self._cheapest_crossing(side, rest)
+        if best == math.inf:
+            # Nothing crosses any more: x's subtree is a tree of its own
+            self._reroot(x, x, -1)
+        else:
+            self._reroot(a, x, b)
+            self.stats["swaps"] += (a, b) != (x, y)
+
+    def _cheapest_crossing(self, side, rest):
+        """(a, b, weight) of the cheapest edge with a in side, b in rest; weight inf if none."""
+        flip = np.count_nonzero(side) > np.count_nonzero(rest)
+        rows, cols = (rest, side) if flip else (side, rest)
+        rows = np.flatnonzero(rows)
+        cols = np.flatnonzero(cols)
+        best, pair = math.inf, (None, None)
+        if len(rows) == 0 or len(cols) == 0:
+            return None, None, best
+
+        W = self.graph.adj_matrix if self.graph.is_array() else None
+        for start in range(0, len(rows), CUT_BLOCK_ROWS):
+            block = rows[start:start + CUT_BLOCK_ROWS]
+            if W is not None:
+                sub = np.array(W[np.ix_(block, cols)], dtype=np.float64)
+            else:
+                sub = np.array([self.graph.row(r)[cols] for r in block.tolist()], dtype=np.float64)
+            sub[sub == 0] = math.inf
+            i, j = np.unravel_index(int(np.argmin(sub)), sub.shape)
+            if sub[i, j] < best:
+                best, pair = float(sub[i, j]), (int(block[i]), int(cols[j]))
+
+        a, b = pair
+        if flip:
+            a, b = b, a
+        return a, b, best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Random weight updates on a dynamic MST, compared to rerunning Prim.")
+    parser.add_argument("-n", "--nodes", type=int, default=2000)
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    g = randomWeightedCompleteBulk(args.nodes, seed=args.seed, dtype=np.float64)
+    mst = DynamicMST(g)
+    rng = random.Random(args.seed)
+
+    started = time.perf_counter()
+    for _ in range(args.updates):
+        u, v = rng.sample(range(1, args.nodes + 1), 2)
+        if rng.random() < 0.5 and mst.T[u] != -1:
+            v = mst.T[u]  # half of the updates hit a tree edge
+        # Traffic makes a trip between half and twice as long
+        mst.update(u, v, round(g.weight(u, v) * rng.uniform(0.5, 2.0), 2))
+    elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fresh = Prim(g)
+    prim_time = time.perf_counter() - started
+
+    print(f"Nodes          : {args.nodes}")
+    print(f"Updates        : {args.updates} ({mst.stats['swaps']} tree changes), "
+          f"{1000 * elapsed / args.updates:.3f} ms each")
+    print(f"Prim           : {1000 * prim_time:.1f} ms")
+    print(f"Tree weight    : {mst.weight():.4f} (Prim: {mst_weight(g, fresh):.4f})")
@@ -0,0 +1,273 @@
+"""
+Saving and loading graphs.
+
+Binary format (save_graph / load_graph): a 64-byte header followed by the
+padded (n+1) x (n+1) weight matrix in C order and then, when present, the
+coordinates as an n x 2 float64 array (row i is node i + 1):
+
+    magic "TSPGRAPH" | version u32 | flags u32 | nodes u64 | seed i64
+    | matrix dtype (8 bytes, e.g. "<f8") | padding
+
+The matrix starts at a fixed, aligned offset, so load_graph can map it
+with np.memmap instead of reading it: every process that loads the same
+file shares one copy through the page cache. Lazy graphs store only
+their coordinates and seed.
+
+TSPLIB (read_tsplib / write_tsplib): EUC_2D coordinate files and
+EXPLICIT FULL_MATRIX files, read and written line by line. EUC_2D
+weights follow TSPLIB (nearest integer Euclidean distance), so the
+published optimal tour lengths apply.
+
+    python3 graph_io.py berlin52.tsp berlin52.graph
+"""
+
+import argparse
+import struct
+
+import numpy as np
+
+from lazyGraph import LazyWeightedGraph
+from weightedGraph import WeightedGraph
+
+MAGIC = b"TSPGRAPH"
+VERSION = 1
+
+# magic, version, flags, nodes, seed, matrix dtype
+HEADER = struct.Struct("<8sIIQq8s")
+HEADER_BYTES = 64
+
+# Header flags
+HAS_MATRIX = 1
+HAS_COORDINATES = 2
+HAS_SEED = 4
+
+# Rows of the matrix written / computed per block
+IO_BLOCK_ROWS = 1024
+
+# ---------------------------
+# Binary format
+# ---------------------------
+def save_graph(graph, path):
+    """
+    Write graph (list, array or lazy mode) to path in the binary format.
+    List-mode matrices are stored as float64.
+    """
+    n = graph.num_nodes
+    lazy = graph.is_lazy()
+    dtype = np.dtype(np.float64) if lazy or not graph.is_array() else graph.adj_matrix.dtype
+    seed = getattr(graph, "seed", None)
+
+    flags = 0 if lazy else HAS_MATRIX
+    if graph.coordinates:
+        flags |= HAS_COORDINATES
+    if seed is not None:
+        flags |= HAS_SEED
+
+    with open(path, "wb") as f:
+        header = HEADER.pack(MAGIC, VERSION, flags, n, seed or 0, dtype.str.encode())
+        f.write(header.ljust(HEADER_BYTES, b"\0"))
+        if flags & HAS_MATRIX:
+            for start in range(0, n + 1, IO_BLOCK_ROWS):
+                np.asarray(graph.adj_matrix[start:start + IO_BLOCK_ROWS], dtype=dtype).tofile(f)
+        if lazy:
+            np.column_stack((graph.x[1:], graph.y[1:])).tofile(f)
+        elif flags & HAS_COORDINATES:
+            xy = np.array([graph.coordinates[v] for v in range(1, n + 1)], dtype=np.float64)
+            xy.reshape(n, 2).tofile(f)
+
+def read_header(path):
+    """Header of a binary graph file as a dict."""
+    with open(path, "rb") as f:
+        raw = f.read(HEADER_BYTES)
+    if len(raw) < HEADER_BYTES:
+        raise ValueError(f"{path}: truncated header")
+    magic, version, flags, n, seed, dtype = HEADER.unpack_from(raw)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not a graph file")
+    if version != VERSION:
+        raise ValueError(f"{path}: unsupported version {version}")
+    return {
+        "version": version,
+        "nodes": n,
+        "seed": seed if flags & HAS_SEED else None,
+        "dtype": np.dtype(dtype.rstrip(b"\0").decode()),
+        "has_matrix": bool(flags & HAS_MATRIX),
+        "has_coordinates": bool(flags & HAS_COORDINATES),
+    }
+
+def load_graph(path, mmap=True, mode="r"):
+    """
+    Load a graph written by save_graph.
+
+    With mmap=True the matrix is an np.memmap of the file (no read, no
+    copy). mode is the np.memmap mode: "r" read-only, "r+" writes go to
+    the file, "c" copy-on-write. mmap=False reads it into memory.
+    Files without a matrix come back as a LazyWeightedGraph.
+    """
+    header = read_header(path)
+    n, dtype = header["nodes"], header["dtype"]
+    matrix_bytes = (n + 1) * (n + 1) * dtype.itemsize if header["has_matrix"] else 0
+
+    xy = None
+    if header["has_coordinates"]:
+        xy = np.fromfile(path, dtype=np.float64, count=2 * n,
+                         offset=HEADER_BYTES + matrix_bytes).reshape(n, 2)
+
+    if not header["has_matrix"]:
+        return LazyWeightedGraph(xy, seed=header["seed"])
+
+    if mmap:
+        matrix = np.memmap(path, dtype=dtype, mode=mode, offset=HEADER_BYTES, shape=(n + 1, n + 1))
+    else:
+        matrix = np.fromfile(path, dtype=dtype, count=(n + 1) * (n + 1),
+                             offset=HEADER_BYTES).reshape(n + 1, n + 1)
+
+    coordinates = None
+    if xy is not None:
+        coordinates = {v: (x, y) for v, (x, y) in enumerate(xy.tolist(), start=1)}
+    graph = WeightedGraph.from_array(matrix, coordinates)
+    graph.seed = header["seed"]
+    return graph
+
+# ---------------------------
+# TSPLIB
+# ---------------------------
+def _tsplib_lines(f):
+    # Stripped, non-empty lines
+    for line in f:
+        line = line.strip()
+        if line:
+            yield line
+
+def read_tsplib(path, dtype=np.float64):
+    """
+    Read a TSPLIB file with EDGE_WEIGHT_TYPE EUC_2D (NODE_COORD_SECTION)
+    or EXPLICIT with EDGE_WEIGHT_FORMAT FULL_MATRIX. The file is read one
+    line at a time straight into the matrix. Returns an array-mode
+    WeightedGraph; spec["NAME"] etc. are left in graph.tsplib.
+
+    0 still means "no edge" in the graph, so two nodes at the same
+    point (weight 0 in TSPLIB) look unconnected.
+    """
+    spec = {}
+    graph = None
+    with open(path) as f:
+        lines = _tsplib_lines(f)
+        for line in lines:
+            if line == "EOF":
+                break
+            if ":" in line:
+                key, value = line.split(":", 1)
+                spec[key.strip().upper()] = value.strip()
+                continue
+
+            section = line.upper()
+            n = int(spec["DIMENSION"])
+            kind = spec.get("EDGE_WEIGHT_TYPE", "").upper()
+            if section == "NODE_COORD_SECTION":
+                if kind != "EUC_2D":
+                    raise ValueError(f"{path}: unsupported EDGE_WEIGHT_TYPE {kind}")
+                xy = np.empty((n, 2), dtype=np.float64)
+                for _ in range(n):
+                    label, x, y = next(lines).split()[:3]
+                    xy[int(label) - 1] = float(x), float(y)
+                graph = WeightedGraph.from_array(euc_2d_matrix(xy, dtype),
+                                                 {v: (x, y) for v, (x, y) in enumerate(xy.tolist(), start=1)})
+            elif section == "EDGE_WEIGHT_SECTION":
+                weight_format = spec.get("EDGE_WEIGHT_FORMAT", "").upper()
+                if kind != "EXPLICIT" or weight_format != "FULL_MATRIX":
+                    raise ValueError(f"{path}: unsupported edge weights {kind} / {weight_format}")
+                graph = WeightedGraph(n, dtype=dtype, seed=None, coordinates={})
+                weights = graph.adj_matrix
+                # Rows may wrap across lines in any way; fill (row, col) onward
+                row, col = 1, 1
+                while row <= n:
+                    values = np.array(next(lines).split(), dtype=np.float64)
+                    while len(values) and row <= n:
+                        take = min(len(values), n + 1 - col)
+                        weights[row, col:col + take] = values[:take]
+                        values = values[take:]
+                        col += take
+                        if col > n:
+                            row, col = row + 1, 1
+                np.fill_diagonal(weights, 0)
+            elif section == "DISPLAY_DATA_SECTION":
+                for _ in range(n):
+                    next(lines)
+            else:
+                raise ValueError(f"{path}: unsupported section {section}")
+
+    if graph is None:
+        raise ValueError(f"{path}: no NODE_COORD_SECTION or EDGE_WEIGHT_SECTION")
+    graph.tsplib = spec
+    return graph
+
+def euc_2d_matrix(xy, dtype=np.float64):
+    """Padded TSPLIB EUC_2D matrix: nint(Euclidean distance), built in row blocks."""
+    n = len(xy)
+    W = np.zeros((n + 1, n + 1), dtype=dtype)
+    x, y = xy[:, 0], xy[:, 1]
+    for start in range(0, n, IO_BLOCK_ROWS):
+        stop = min(start + IO_BLOCK_ROWS, n)
+        dx = x[start:stop, None] - x[None, :]
+        dy = y[start:stop, None] - y[None, :]
+        # nint as TSPLIB defines it: (int)(d + 0.5)
+        W[start + 1:stop + 1, 1:] = np.floor(np.sqrt(dx * dx + dy * dy) + 0.5)
+    np.fill_diagonal(W, 0)
+    return W
+
+def write_tsplib(graph, path, name=None, weight_type="EXPLICIT"):
+    """
+    Write graph as TSPLIB, one matrix row per line.
+
+    weight_type "EXPLICIT" writes the weights as a FULL_MATRIX, exactly
+    (read a float32 graph back with dtype=np.float32). "EUC_2D" writes
+    only the coordinates; a reader then uses TSPLIB distances, not these
+    weights.
+    """
+    n = graph.num_nodes
+    name = name or f"graph{n}"
+    with open(path, "w") as f:
+        f.write(f"NAME : {name}\nTYPE : TSP\nDIMENSION : {n}\n")
+        if weight_type == "EUC_2D":
+            f.write("EDGE_WEIGHT_TYPE : EUC_2D\nNODE_COORD_SECTION\n")
+            for v in range(1, n + 1):
+                x, y = graph.coordinates[v]
+                f.write(f"{v} {x:.15g} {y:.15g}\n")
+        elif weight_type == "EXPLICIT":
+            f.write("EDGE_WEIGHT_TYPE : EXPLICIT\nEDGE_WEIGHT_FORMAT : FULL_MATRIX\nEDGE_WEIGHT_SECTION\n")
+            for u in range(1, n + 1):
+                row = graph.row(u)[1:]
+                if np.array_equal(row, np.round(row)):
+                    f.write(" ".join(map(str, row.astype(np.int64).tolist())) + "\n")
+                else:
+                    # Shortest text that reads back as the same value of row.dtype
+                    f.write(" ".join(np.format_float_positional(w, trim="-") for w in row) + "\n")
+        else:
+            raise ValueError(f"Unsupported weight type: {weight_type}")
+        f.write("EOF\n")
+
+# ---------------------------
+# Conversion by file extension
+# ---------------------------
+def load_any(path):
+    if path.endswith(".tsp"):
+        return read_tsplib(path)
+    return load_graph(path)
+
+def save_any(graph, path):
+    if path.endswith(".tsp"):
+        write_tsplib(graph, path)
+    else:
+        save_graph(graph, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert between TSPLIB (.tsp) and binary graph files.")
+    parser.add_argument("source")
+    parser.add_argument("target")
+    args = parser.parse_args()
+
+    g = load_any(args.source)
+    save_any(g, args.target)
+    print(f"{args.source} -> {args.target}: {g.num_nodes} nodes")
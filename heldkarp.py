@@ -1,74 +1,323 @@
-from itertools import combinations
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
 import time
 
-def hk_solve(dist):
-    n = len(dist)
-    # Number of subsets: 2^n
-    N = 1 << n
-    INF = float('inf')
-
-    # dp[mask][j] = minimum cost to reach subset 'mask' and end at node j
-    dp = [[INF] * n for _ in range(N)]
-    # parent[mask][j] = previous node before j in optimal path for (mask, j)
-    parent = [[None] * n for _ in range(N)]
-
-    # Base case: start at node 0, mask = 1<<0
-    dp[1][0] = 0
-
-    # Iterate over all subsets that include node 0
-    for mask in range(1, N):
-        if not (mask & 1):
-            continue  # we always require the tour to start at node 0
-        for j in range(1, n):
-            if not (mask & (1 << j)):
-                continue  # j not in subset
-            prev_mask = mask ^ (1 << j)
-            # Try all possibilities of coming to j from some k in prev_mask
-            for k in range(n):
-                if prev_mask & (1 << k):
-                    cost = dp[prev_mask][k] + dist[k][j]
-                    if cost < dp[mask][j]:
-                        dp[mask][j] = cost
-                        parent[mask][j] = k
+import numpy as np
+
+import profiling
+from budget import as_budget
+from nn_2opt import nearest_neighbor, tour_cost, two_opt
+from randomGraph import randomWeightedCompleteBulk
+from shared_arrays import attach_shared, create_shared, release_shared
+from tour import Tour
+from weightedGraph import WeightedGraph
+
+# Largest instance Held-Karp runs without a warning (the layered NumPy
+# solver needs about 1 GB of dp/parent tables at 24 nodes)
+HELD_KARP_LIMIT = 24
+
+# Rows of the dp table relaxed per vectorized step; bounds the temporaries
+# to about CHUNK_ROWS * n floats
+CHUNK_ROWS = 1 << 15
+
+def subset_order(m):
+    """
+    Sort every subset of {0..m-1} (as a bitmask) by popcount.
+    Returns (order, bounds): the masks with k bits set are order[bounds[k]:bounds[k+1]].
+    """
+    masks = np.arange(1 << m, dtype=np.int32)
+    popcount = np.zeros(1 << m, dtype=np.int8)
+    for b in range(m):
+        popcount += ((masks >> b) & 1).astype(np.int8)
+
+    order = np.argsort(popcount, kind="stable").astype(np.int32)
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(popcount, minlength=m + 1))))
+    return order, bounds
+
+def subset_layers(m):
+    """List where layers[k] is an int32 array of the masks with k bits set."""
+    order, bounds = subset_order(m)
+    return [order[bounds[k]:bounds[k + 1]] for k in range(m + 1)]
+
+def relax_masks(dp, parent, d, masks):
+    """
+    Fill dp[mask][j] / parent[mask][j] for every mask in `masks` (all from the
+    same popcount layer) and every j in mask:
+
+        dp[mask][j] = min over i in mask - {j} of dp[mask - {j}][i] + d[i][j]
+
+    Only rows of the previous layer are read, so disjoint sets of masks from
+    one layer can be relaxed independently.
+    """
+    m = d.shape[0]
+    for j in range(m):
+        bit = np.int32(1 << j)
+        with_j = masks[(masks & bit) != 0]
+        for lo in range(0, len(with_j), CHUNK_ROWS):
+            sel = with_j[lo:lo + CHUNK_ROWS]
+            # dp[prev][i] is inf for every i outside prev, so a plain
+            # row-wise min over all i only considers valid predecessors
+            cand = dp[sel ^ bit] + d[:, j]
+            best = np.argmin(cand, axis=1)
+            dp[sel, j] = cand[np.arange(len(sel)), best]
+            parent[sel, j] = best
+
+def hk_tables(dist, dtype, alloc=None):
+    """
+    Set up the Held-Karp tables for a full 0-based distance matrix.
+
+    Node 0 is the fixed start, so masks only range over nodes 1..n-1
+    (2^(n-1) rows instead of 2^n). Bit b of a mask stands for node b + 1.
+    alloc(shape, dtype) lets the caller choose where the tables live.
+    Returns (d, dp, parent) with the base case filled in.
+    """
+    if alloc is None:
+        alloc = np.empty
+    m = len(dist) - 1
+
+    d = alloc((m, m), dtype)
+    d[...] = dist[1:, 1:]
+
+    # dp[mask][j] = minimum cost to start at 0, visit 'mask' and end at node j+1
+    dp = alloc((1 << m, m), dtype)
+    dp[...] = np.inf
+    # parent[mask][j] = previous node (bit index) before j, -1 when it is node 0
+    parent = alloc((1 << m, m), np.int8)
+    parent[...] = -1
+
+    # Base case: go straight from node 0 to j
+    singles = np.int32(1) << np.arange(m, dtype=np.int32)
+    dp[singles, np.arange(m)] = dist[0, 1:]
+
+    return d, dp, parent
+
+def hk_solve(dist, dtype=np.float32, budget=None):
+    """
+    Held-Karp over subsets processed in popcount layers.
+
+    dp is stored as `dtype` (float32 by default) and parents as int8.
+    Returns (min_cost, path) with path a closed cycle [0, ..., 0], or None
+    when `budget` (budget.Budget) expires; it is checked between layers.
+    """
+    full_dist = np.asarray(dist, dtype=np.float64)
+    n = len(full_dist)
+    if n == 1:
+        return 0.0, [0, 0]
+
+    with profiling.span("tables"):
+        d, dp, parent = hk_tables(full_dist, dtype)
+        layers = subset_layers(n - 1)
+
+    with profiling.span("layers"):
+        for k in range(2, n):
+            if budget is not None and budget.expired():
+                return None
+            relax_masks(dp, parent, d, layers[k])
+            # Every mask with k bits fills k cells
+            profiling.count("held_karp.dp_cells", len(layers[k]) * k)
+
+    with profiling.span("close"):
+        return close_tour(dp, parent, full_dist)
+
+def close_tour(dp, parent, full_dist):
+    """Pick the best last node, walk the parent table back and cost the tour in float64."""
+    m = dp.shape[1]
+    full_mask = (1 << m) - 1
 
     # Close the tour: return to node 0
-    full_mask = (1 << n) - 1
-    min_cost = INF
-    last = None
-    for j in range(1, n):
-        cost = dp[full_mask][j] + dist[j][0]
-        if cost < min_cost:
-            min_cost = cost
-            last = j
+    last = int(np.argmin(dp[full_mask] + full_dist[1:, 0]))
 
     # Reconstruct path
-    path = []
+    path = [0]
     mask = full_mask
     curr = last
-    while curr is not None:
-        path.append(curr)
-        prev = parent[mask][curr]
+    while curr != -1:
+        path.append(curr + 1)
+        prev = int(parent[mask, curr])
         mask ^= (1 << curr)
         curr = prev
-    path.reverse()
     path.append(0)
-    path.reverse()
+
+    min_cost = 0.0
+    for a, b in zip(path, path[1:]):
+        min_cost += full_dist[a, b]
 
     return min_cost, path
 
-def held_karp(n, dist):
-    temp = [[0]*n for _ in range(n)]
-    for i in range(n):
-        for j in range(n):
-            temp[i][j] = dist[i+1][j+1]
+# ---------------------------
+# Multi-core Held-Karp
+# ---------------------------
+# Layers smaller than this are relaxed in the calling process; handing
+# them to the pool costs more than it saves
+PARALLEL_MIN_LAYER = 1 << 12
+
+# Shared tables mapped once per worker by _attach_tables
+_worker_tables = None
+
+def _attach_tables(specs):
+    global _worker_tables
+    blocks, arrays = zip(*(attach_shared(spec) for spec in specs))
+    # Keep the SharedMemory handles alive as long as the arrays
+    _worker_tables = (blocks, arrays)
+
+def _relax_range(lo, hi):
+    _, (d, dp, parent, order) = _worker_tables
+    relax_masks(dp, parent, d, order[lo:hi])
+
+def hk_solve_parallel(dist, workers=None, dtype=np.float32, budget=None):
+    """
+    Held-Karp with each popcount layer split across a process pool.
+
+    Every (mask, j) cell of a layer only reads the previous layer, so the
+    layer's masks are cut into contiguous ranges and relaxed by different
+    workers. dp, parent, the distance matrix and the sorted mask order live
+    in shared memory; tasks only carry (lo, hi) offsets.
+    Same result as hk_solve (None when the budget expires).
+    """
+    full_dist = np.asarray(dist, dtype=np.float64)
+    n = len(full_dist)
+    if n == 1:
+        return 0.0, [0, 0]
+    workers = workers or os.cpu_count() or 1
+
+    blocks = []
+    specs = []
+
+    def alloc(shape, table_dtype):
+        shm, array, spec = create_shared(shape, table_dtype)
+        blocks.append(shm)
+        specs.append(spec)
+        return array
+
+    d = dp = parent = order = None
+    try:
+        with profiling.span("tables"):
+            d, dp, parent = hk_tables(full_dist, dtype, alloc)
+            masks, bounds = subset_order(n - 1)
+            order = alloc(masks.shape, masks.dtype)
+            order[...] = masks
+            del masks
+
+        with profiling.span("layers"), \
+                ProcessPoolExecutor(max_workers=workers, initializer=_attach_tables,
+                                    initargs=(specs,)) as pool:
+            for k in range(2, n):
+                if budget is not None and budget.expired():
+                    return None
+                lo, hi = int(bounds[k]), int(bounds[k + 1])
+                profiling.count("held_karp.dp_cells", (hi - lo) * k)
+                if hi - lo < PARALLEL_MIN_LAYER:
+                    relax_masks(dp, parent, d, order[lo:hi])
+                    continue
+
+                # A few ranges per worker to even out the load
+                cuts = np.linspace(lo, hi, 4 * workers + 1).astype(int)
+                jobs = [pool.submit(_relax_range, int(a), int(b))
+                        for a, b in zip(cuts, cuts[1:]) if b > a]
+                for job in jobs:
+                    job.result()
+
+        with profiling.span("close"):
+            return close_tour(dp, parent, full_dist)
+    finally:
+        # The views must go before their blocks can be closed
+        d = dp = parent = order = None
+        release_shared(*blocks)
+
+def held_karp(n, dist, workers=None, time_budget=None, progress=None):
+    # dist is the padded graph matrix (list of lists or NumPy array);
+    # drop row/column 0 so node i+1 becomes index i.
+    # Returns (min_cost, tour) with tour a Tour starting at vertex 1
+    min_cost, path, _ = held_karp_with_stats(n, dist, workers, time_budget, progress)
+    return min_cost, path
+
+def held_karp_with_stats(n, dist, workers=None, time_budget=None, progress=None, incumbent=None):
+    """
+    held_karp with a wall-clock budget.
+
+    With a time_budget (or a progress callback) an NN + 2-opt tour is built
+    first as the incumbent and reported (a given `incumbent` tour, e.g. a
+    cached one, is used instead). If the budget runs out before the
+    last dp layer, that tour is returned instead of the optimum. The budget
+    is checked between layers; allocating the tables is not interrupted.
+    Returns (cost, tour, info) with info = {"optimal": bool, "time": float}.
+    """
+    budget = as_budget(time_budget, progress, "held_karp")
+    full = np.asarray(dist, dtype=np.float64)[:n + 1, :n + 1]
+    temp = full[1:, 1:]
+
+    graph = WeightedGraph.from_array(np.ascontiguousarray(full))
+    if incumbent is not None:
+        incumbent = Tour(incumbent, n)
+        budget.improve(tour_cost(graph, incumbent))
+    elif budget.deadline is not None or budget.progress is not None:
+        incumbent = two_opt(graph, nearest_neighbor(graph, 1), budget=budget)
+
     #start = time.time()
-    min_cost, zero_based_path = hk_solve(temp)
+    with profiling.span("held_karp"):
+        if workers is None or workers == 1:
+            solved = hk_solve(temp, budget=budget)
+        else:
+            solved = hk_solve_parallel(temp, workers, budget=budget)
     #end = time.time()
-    path = [x+1 for x in zero_based_path]
+
+    if solved is None and incumbent is None:
+        # Only possible with an already spent budget and no incumbent
+        incumbent = nearest_neighbor(graph, 1)
+    if solved is None:
+        i = incumbent.index(1)
+        path = Tour(incumbent[i:] + incumbent[:i], n)
+        min_cost = tour_cost(graph, path)
+    else:
+        min_cost, zero_based_path = solved
+        path = Tour([x+1 for x in zero_based_path[:-1]], n)
+        budget.improve(min_cost)
     #print("shortest path: " +str(path))
     #print("weight: " +str(zero_based_path[0]))
     #print("execution time: " +str(end - start))
 
-    return min_cost, path
+    info = {"optimal": solved is not None, "time": budget.elapsed()}
+    return float(min_cost), path, info
+
+def compare_parallel(n, dist, workers=None):
+    """
+    Run the serial and the parallel solver on the same instance and
+    report both wall times and the speedup.
+    """
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    serial_cost, serial_path = held_karp(n, dist)
+    serial_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel_cost, parallel_path = held_karp(n, dist, workers=workers)
+    parallel_time = time.perf_counter() - start
+
+    return {
+        "nodes": n,
+        "workers": workers,
+        "serial_time": serial_time,
+        "parallel_time": parallel_time,
+        "speedup": serial_time / parallel_time if parallel_time > 0 else float("inf"),
+        "costs_match": abs(serial_cost - parallel_cost) < 1e-6,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare serial and multi-core Held-Karp.")
+    parser.add_argument("-n", "--nodes", type=int, default=18)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
 
+    g = randomWeightedCompleteBulk(args.nodes, seed=args.seed)
+    report = compare_parallel(args.nodes, g.adj_matrix, args.workers)
 
+    print(f"Nodes          : {report['nodes']}")
+    print(f"Workers        : {report['workers']}")
+    print(f"Serial         : {report['serial_time']:.4f}s")
+    print(f"Parallel       : {report['parallel_time']:.4f}s")
+    print(f"Speedup        : {report['speedup']:.2f}x")
+    print(f"Costs match    : {report['costs_match']}")
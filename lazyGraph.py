@@ -0,0 +1,337 @@
+"""
+Coordinate-only graph for instances too large for a full matrix.
+
+LazyWeightedGraph keeps just the x / y arrays and computes a weight when
+it is asked for, with the same time-cost model as WeightedGraph
+(timeCost: distance / 10 plus per-edge penalties keyed by a seed). With
+the generator's points and seed it reproduces the generated matrix
+exactly. Memory is O(n) plus
+two bounded caches: recently used pairs (weight) and recently used rows
+(row / adj_matrix[u]).
+
+adj_matrix is a LazyMatrix, which answers the indexing the solvers use
+on the NumPy matrix (W[u][v], W[u], W[u, cols], W[us, vs], W.item(u, v)),
+so they run on a lazy graph unchanged. Anything that really needs the
+whole matrix (np.asarray(W), Held-Karp, ...) materializes it, which is
+refused above LAZY_MATERIALIZE_LIMIT nodes.
+"""
+
+from collections import OrderedDict
+import functools
+import math
+
+import numpy as np
+
+from timeCost import edge_penalties, edge_penalty, travel_times
+
+# Pairs kept by the weight cache and rows kept by the row cache
+LAZY_PAIR_CACHE = 1 << 16
+LAZY_ROW_CACHE = 64
+
+# Largest graph that may be turned into a full matrix
+LAZY_MATERIALIZE_LIMIT = 5000
+
+# Average number of points per cell of the grid used for candidate lists
+GRID_POINTS_PER_CELL = 8
+
+# A rounded weight is at least distance / 10 - WEIGHT_SLACK
+WEIGHT_SLACK = 0.01
+
+# Widest grid window (in cells) the lazy nearest neighbor searches before
+# it scans every unvisited vertex instead
+GRID_NN_REACH = 16
+
+
+class LazyMatrix:
+    """Read-only, matrix-like view of a LazyWeightedGraph's weights."""
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.shape = (graph.num_nodes + 1, graph.num_nodes + 1)
+        self.ndim = 2
+        self.dtype = np.dtype(np.float64)
+        # W.item(u, v) is the graph's cached scalar lookup
+        self.item = graph.weight
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        graph = self.graph
+        if not isinstance(key, tuple):
+            return graph.row(int(key))
+
+        rows, cols = key
+        if isinstance(rows, slice):
+            return np.stack([graph.row(u)[cols] for u in range(*rows.indices(self.shape[0]))])
+        if np.ndim(rows) == 0:
+            if np.ndim(cols) == 0 and not isinstance(cols, slice):
+                return graph.weight(int(rows), int(cols))
+            return graph.row(int(rows))[cols]
+        if isinstance(cols, slice):
+            return np.stack([graph.row(int(u))[cols] for u in np.ravel(rows)]).reshape(
+                np.shape(rows) + (-1,))
+        return graph.weights(rows, cols)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.graph.materialize().astype(dtype or np.float64, copy=False)
+
+
+class LazyWeightedGraph:
+    def __init__(self, coordinates, seed=None, pair_cache=LAZY_PAIR_CACHE, row_cache=LAZY_ROW_CACHE):
+        """
+        coordinates: {node: (x, y)} for nodes 1..n, or an (n, 2) array
+                     whose row i holds node i + 1
+        seed:        key of the per-edge traffic / light penalties (the
+                     generator's seed); None means base travel time only
+        """
+        if isinstance(coordinates, dict):
+            n = len(coordinates)
+            xy = np.array([coordinates[v] for v in range(1, n + 1)], dtype=np.float64).reshape(n, 2)
+        else:
+            xy = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+            n = len(xy)
+
+        self.num_nodes = n
+        self.dtype = None
+        # Padded like the matrix: x[v], y[v] for v = 1..n
+        self.x = np.concatenate(([0.0], xy[:, 0]))
+        self.y = np.concatenate(([0.0], xy[:, 1]))
+        self.seed = seed
+        self.pair_cache = pair_cache
+        self.row_cache = row_cache
+        self._setup()
+
+    def _setup(self):
+        self.weight = functools.lru_cache(maxsize=self.pair_cache)(self._weight)
+        self.adj_matrix = LazyMatrix(self)
+        self._rows = OrderedDict()
+        self._coordinates = None
+        self._grid = None
+
+    # Caches are rebuilt rather than pickled (e.g. when sent to pool workers)
+    def __getstate__(self):
+        return {key: self.__dict__[key] for key in
+                ("num_nodes", "dtype", "x", "y", "seed", "pair_cache", "row_cache")}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup()
+
+    @property
+    def coordinates(self):
+        if self._coordinates is None:
+            self._coordinates = {v: (self.x[v], self.y[v]) for v in range(1, self.num_nodes + 1)}
+        return self._coordinates
+
+# ----------- Weights --------------
+
+    def weights(self, us, vs):
+        """Weights of the edges (us[i], vs[i]) for integer arrays (broadcast like NumPy)."""
+        us = np.asarray(us, dtype=np.intp)
+        vs = np.asarray(vs, dtype=np.intp)
+        penalty = 0.0 if self.seed is None else edge_penalties(self.seed, us, vs)
+        total = travel_times(self.x[us] - self.x[vs], self.y[us] - self.y[vs], penalty)
+        # No self loops, and row / column 0 stay padding
+        return np.where((us == vs) | (us == 0) | (vs == 0), 0.0, total)
+
+    def _weight(self, u, v):
+        if u == v or u == 0 or v == 0:
+            return 0.0
+        # Same NumPy rounding as weights(), so both paths agree exactly
+        penalty = 0.0 if self.seed is None else edge_penalty(self.seed, u, v)
+        return float(travel_times(self.x[u] - self.x[v], self.y[u] - self.y[v], penalty))
+
+    def row(self, node):
+        """Weights from node to every vertex (index 0 is padding), cached."""
+        row = self._rows.get(node)
+        if row is not None:
+            self._rows.move_to_end(node)
+            return row
+
+        row = self.weights(np.full(self.num_nodes + 1, node), np.arange(self.num_nodes + 1))
+        row.flags.writeable = False
+        self._rows[node] = row
+        if len(self._rows) > self.row_cache:
+            self._rows.popitem(last=False)
+        return row
+
+    def materialize(self):
+        """The full padded matrix as a float64 array (small graphs only)."""
+        n = self.num_nodes
+        if n > LAZY_MATERIALIZE_LIMIT:
+            raise MemoryError(f"Refusing to build a {n + 1} x {n + 1} matrix from a lazy graph "
+                              f"(limit {LAZY_MATERIALIZE_LIMIT} nodes)")
+        idx = np.arange(n + 1)
+        return self.weights(idx[:, None], idx[None, :])
+
+# ----------- Same surface as WeightedGraph --------------
+
+    def is_array(self):
+        # adj_matrix takes NumPy-style indexing, so the vectorized paths apply
+        return True
+
+    def is_lazy(self):
+        return True
+
+    def as_array(self):
+        return self.adj_matrix
+
+    def edge_exists(self, node1, node2):
+        return node1 != node2
+
+    def num_edges(self):
+        return self.num_nodes * (self.num_nodes - 1) // 2
+
+    def distanceCal(self, u, v):
+        return round(math.hypot(self.x[u] - self.x[v], self.y[u] - self.y[v]), 2)
+
+    def edgeTimeCost(self, u, v):
+        return self.weight(u, v)
+
+    def print_graph(self):
+        print(f"LazyWeightedGraph with {self.num_nodes} nodes (weights computed on demand)")
+
+# ----------- Spatial grid --------------
+
+    def grid(self):
+        """
+        Bucket the points in square cells of side `cell`, about
+        GRID_POINTS_PER_CELL per cell. Returns (cell, gx, gy, cx, cy,
+        starts, members): cx[v] / cy[v] are v's cell coordinates (index 0
+        unused) and the vertices of cell c = cx * gy + cy are
+        members[starts[c]:starts[c + 1]]. Built once and cached.
+        """
+        if self._grid is None:
+            n = self.num_nodes
+            x, y = self.x[1:], self.y[1:]
+            x0, y0 = x.min(), y.min()
+            area = max((x.max() - x0) * (y.max() - y0), 1.0)
+            cell = max(math.sqrt(area * GRID_POINTS_PER_CELL / n), 1e-9)
+            gx = int((x.max() - x0) // cell) + 1
+            gy = int((y.max() - y0) // cell) + 1
+
+            cx = np.concatenate(([0], ((x - x0) // cell).astype(np.intp)))
+            cy = np.concatenate(([0], ((y - y0) // cell).astype(np.intp)))
+            cell_id = cx[1:] * gy + cy[1:]
+            order = np.argsort(cell_id, kind="stable")
+            starts = np.searchsorted(cell_id[order], np.arange(gx * gy + 1))
+            members = order + 1  # vertex labels sorted by cell
+            self._grid = (cell, gx, gy, cx, cy, starts, members)
+        return self._grid
+
+    def window(self, a, b, reach):
+        """
+        Vertices in the cells within `reach` cells of cell (a, b).
+        Returns (vertices, whole_grid) where whole_grid says the window
+        already covers every cell.
+        """
+        _, gx, gy, _, _, starts, members = self.grid()
+        lo_x, hi_x = max(a - reach, 0), min(a + reach, gx - 1)
+        lo_y, hi_y = max(b - reach, 0), min(b + reach, gy - 1)
+        vertices = np.concatenate([members[starts[col * gy + lo_y]:starts[col * gy + hi_y + 1]]
+                                   for col in range(lo_x, hi_x + 1)])
+        whole_grid = lo_x == 0 and lo_y == 0 and hi_x == gx - 1 and hi_y == gy - 1
+        return vertices, whole_grid
+
+# ----------- Candidate lists --------------
+
+    def candidate_lists(self, k):
+        """
+        The k lowest-weight neighbors of every vertex, lowest first, without
+        ever building a full row: each cell's vertices only look at the
+        surrounding cells. Since penalties are never negative, a vertex at
+        distance d weighs at least d / 10 - WEIGHT_SLACK, so the window
+        grows until nothing outside it can beat the k-th weight found.
+        Returns a list of lists like local_search.candidate_lists.
+        """
+        n = self.num_nodes
+        k = min(k, n - 1)
+        candidates = [[] for _ in range(n + 1)]
+        if k <= 0:
+            return candidates
+
+        cell, _, gy, cx, cy, starts, members = self.grid()
+        for c in np.unique(cx[1:] * gy + cy[1:]).tolist():
+            a, b = c // gy, c % gy
+            pending = members[starts[c]:starts[c + 1]]
+            reach = 1
+            while len(pending):
+                window, whole_grid = self.window(a, b, reach)
+                kk = min(k, len(window) - 1)
+                if kk < k and not whole_grid:
+                    reach *= 2
+                    continue
+
+                W = self.weights(pending[:, None], window[None, :])
+                W[pending[:, None] == window[None, :]] = np.inf
+                nearest = np.argpartition(W, kk - 1, axis=1)[:, :kk]
+                best = np.take_along_axis(W, nearest, axis=1)
+                # Anything outside the window is at least reach cells away
+                done = whole_grid | (best.max(axis=1) < reach * cell / 10.0 - WEIGHT_SLACK)
+
+                ranked = np.argsort(best, axis=1, kind="stable")
+                chosen = np.take_along_axis(window[nearest], ranked, axis=1)
+                for v, row in zip(pending[done].tolist(), chosen[done].tolist()):
+                    candidates[v] = row
+                pending = pending[~done]
+                reach *= 2
+
+        return candidates
+
+# ----------- Nearest neighbor tour --------------
+
+    def nearest_neighbor(self, start=1):
+        """
+        The same tour as nn_2opt.nearest_neighbor (ties go to the lowest
+        label), found through the grid: the nearest unvisited vertex is
+        searched in growing windows around the current cell, and only once
+        the window is so wide that GRID_NN_REACH is passed are all unvisited
+        vertices scanned. Returns the visiting order as a list.
+        """
+        n = self.num_nodes
+        cell, _, gy, cx, cy, starts, members = self.grid()
+        visited = np.zeros(n + 1, dtype=bool)
+        visited[0] = True
+
+        # Unvisited vertices packed at the front, with their positions
+        unvisited = np.arange(1, n + 1)
+        where = np.concatenate(([0], np.arange(n)))
+        left = n
+
+        tour = [start]
+        last = start
+        for _ in range(n):
+            visited[last] = True
+            i = where[last]
+            left -= 1
+            moved = unvisited[left]
+            unvisited[i], where[moved] = moved, i
+            if left == 0:
+                break
+
+            chosen = None
+            reach = 1
+            while reach <= GRID_NN_REACH:
+                window, whole_grid = self.window(cx[last], cy[last], reach)
+                window = window[~visited[window]]
+                if len(window):
+                    W = self.weights(last, window)
+                    best = W.min()
+                    if whole_grid or best < reach * cell / 10.0 - WEIGHT_SLACK:
+                        chosen = int(window[W == best].min())
+                        break
+                elif whole_grid:
+                    break
+                reach *= 2
+
+            if chosen is None:
+                rest = unvisited[:left]
+                W = self.weights(last, rest)
+                best = W.min()
+                chosen = int(rest[W == best].min())
+
+            tour.append(chosen)
+            last = chosen
+
+        return tour
@@ -0,0 +1,360 @@
+import argparse
+from collections import deque
+import time
+
+import numpy as np
+
+from budget import as_budget
+import profiling
+from nn_2opt import nearest_neighbor, tour_cost
+from randomGraph import randomWeightedCompleteBulk
+from tour import Tour
+
+# Neighbors kept per vertex in the candidate lists
+CANDIDATES = 8
+
+# Rows of the weight matrix ranked per vectorized batch
+CANDIDATE_BLOCK_ROWS = 1024
+
+# Moves must gain more than this to count as improvements
+EPS = 1e-9
+
+# Longest segment moved by Or-opt and by 3-opt segment insertion
+OR_OPT_MAX = 3
+SEGMENT_MAX = 25
+
+# Neighborhoods in the order local_search applies them by default
+DEFAULT_CHAIN = ("2opt", "oropt", "3opt")
+
+# ---------------------------
+# Candidate lists
+# ---------------------------
+def candidate_lists(graph, k=CANDIDATES):
+    """
+    The k nearest neighbors of every vertex, nearest first.
+    Returns a list of lists indexed by vertex label (index 0 is empty).
+    Lazy graphs use their grid search instead of ranking full rows.
+    """
+    if graph.is_lazy():
+        return graph.candidate_lists(k)
+    W = graph.as_array()
+    n = graph.num_nodes
+    k = min(k, n - 1)
+    candidates = [[]]
+    if k <= 0:
+        return candidates + [[] for _ in range(n)]
+
+    for start in range(1, n + 1, CANDIDATE_BLOCK_ROWS):
+        stop = min(start + CANDIDATE_BLOCK_ROWS, n + 1)
+        rows = np.array(W[start:stop, 1:], dtype=np.float64)
+        # A vertex is never its own candidate
+        rows[np.arange(stop - start), np.arange(start - 1, stop - 1)] = np.inf
+
+        nearest = np.argpartition(rows, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(rows, nearest, axis=1), axis=1, kind="stable")
+        nearest = np.take_along_axis(nearest, order, axis=1) + 1
+        candidates.extend(nearest.tolist())
+
+    return candidates
+
+# ---------------------------
+# Local search engine
+# ---------------------------
+class LocalSearch:
+    """
+    Neighbor-list local search on one tour.
+
+    The tour is a Tour (array plus position index), so successor and
+    predecessor lookups are O(1). Every neighborhood keeps its own queue
+    of active vertices (don't-look bits): a vertex leaves the queue when
+    no move around it improves the tour and comes back when one of its
+    tour edges changes. Each move method takes an active vertex, applies
+    the first improving move it finds and returns the vertices whose
+    edges changed (None when there was nothing to gain).
+    """
+
+    def __init__(self, graph, tour, candidates=None, k=CANDIDATES):
+        self.graph = graph
+        self.candidates = candidate_lists(graph, k) if candidates is None else candidates
+        self.dist = graph.as_array().item
+        self.tour = Tour(tour, graph.num_nodes)
+        self.stats = {}
+
+    def step(self, v, forward):
+        return self.tour.next(v) if forward else self.tour.prev(v)
+
+# ---------- 2-opt ----------
+
+    def two_opt_move(self, a):
+        """Replace (a, b) and (c, d) by (a, c) and (b, d) for c in a's candidates."""
+        dist, tour = self.dist, self.tour
+        evaluations = 0
+
+        for forward in (True, False):
+            b = self.step(a, forward)
+            d_ab = dist(a, b)
+
+            for c in self.candidates[a]:
+                d_ac = dist(a, c)
+                if d_ac >= d_ab:
+                    break  # candidates are sorted, no later c can gain
+                d = self.step(c, forward)
+                if c == b or d == a:
+                    continue
+
+                evaluations += 1
+                delta = d_ac + dist(b, d) - d_ab - dist(c, d)
+                if delta < -EPS:
+                    if forward:
+                        # a b ... c d  ->  a c ... b d
+                        tour.reverse(tour.pos[b], tour.pos[c])
+                    else:
+                        # d c ... b a  ->  d b ... c a
+                        tour.reverse(tour.pos[c], tour.pos[b])
+                    self.evaluations += evaluations
+                    return (a, b, c, d)
+
+        self.evaluations += evaluations
+        return None
+
+# ---------- Or-opt ----------
+
+    def or_opt_move(self, a, max_length=OR_OPT_MAX):
+        """
+        Relocate the segment of 1..max_length vertices starting at a
+        (in either direction) between two adjacent vertices c, o where c is
+        a candidate of one of the segment ends. Both orientations are tried.
+        """
+        dist = self.dist
+        n = len(self.tour)
+        evaluations = 0
+
+        for forward in (True, False):
+            p = self.step(a, not forward)
+            e = a
+            for length in range(1, min(max_length, n - 3) + 1):
+                if length > 1:
+                    e = self.step(e, forward)
+                nx = self.step(e, forward)
+                if nx == p:
+                    break
+                removal_gain = dist(p, a) + dist(e, nx) - dist(p, nx)
+                if removal_gain <= EPS:
+                    continue
+
+                segment = self.path(a, e, forward)
+                # (end of the segment that touches c, the other end)
+                for near, far in ((a, e), (e, a)):
+                    for c in self.candidates[near]:
+                        d_near = dist(c, near)
+                        if d_near >= removal_gain:
+                            break
+                        if c in segment:
+                            continue
+                        for o in (self.tour.next(c), self.tour.prev(c)):
+                            if o in segment:
+                                continue
+                            evaluations += 1
+                            delta = d_near + dist(far, o) - dist(c, o) - removal_gain
+                            if delta < -EPS:
+                                # a..e runs in the `forward` direction
+                                self.tour.move_segment(near, far, forward == (near == a), c, o)
+                                self.evaluations += evaluations
+                                return (p, nx, a, e, c, o)
+
+        self.evaluations += evaluations
+        return None
+
+    def path(self, u, v, forward):
+        """Set of vertices from u to v walking in one direction."""
+        vertices = {u}
+        while u != v:
+            u = self.step(u, forward)
+            vertices.add(u)
+        return vertices
+
+# ---------- 3-opt segment insertion ----------
+
+    def segment_insertion_move(self, a, max_length=SEGMENT_MAX):
+        """
+        Pure 3-opt move: break (a, b), (pc, c) and (e, ne), and splice the
+        segment c..e (up to max_length vertices, grown from a candidate c
+        of a in either direction) in between a and b with c next to a:
+
+            new edges (a, c), (e, b), (pc, ne)
+        """
+        dist = self.dist
+        evaluations = 0
+
+        for forward in (True, False):
+            b = self.step(a, forward)
+            d_ab = dist(a, b)
+
+            for c in self.candidates[a]:
+                d_ac = dist(a, c)
+                if d_ac >= d_ab:
+                    break
+                if c == b:
+                    continue
+
+                for grow in (True, False):
+                    pc = self.step(c, not grow)
+                    if pc == a or pc == b:
+                        continue
+                    base = d_ac - d_ab - dist(pc, c)
+
+                    e = c
+                    for length in range(1, max_length + 1):
+                        if length > 1:
+                            e = ne
+                        ne = self.step(e, grow)
+                        if e == a or e == b or ne == a or ne == b:
+                            break
+
+                        evaluations += 1
+                        delta = base + dist(e, b) + dist(pc, ne) - dist(e, ne)
+                        if delta < -EPS:
+                            self.tour.move_segment(c, e, grow, a, b)
+                            self.evaluations += evaluations
+                            return (a, b, c, e, pc, ne)
+
+        self.evaluations += evaluations
+        return None
+
+# ---------- Driver ----------
+
+    MOVES = {
+        "2opt": "two_opt_move",
+        "oropt": "or_opt_move",
+        "3opt": "segment_insertion_move",
+    }
+
+    def run(self, chain=DEFAULT_CHAIN, active=None, budget=None):
+        """
+        Variable neighborhood descent over `chain`: drain the queue of the
+        first neighborhood, then the next one; whenever a later one improves
+        the tour, go back to the first. Stops when every queue is empty.
+        active (vertices) starts the queues with only those instead of the
+        whole tour, for repairing a tour that changed in one place.
+        With a budget (see budget.py) the descent stops, keeping the tour
+        as improved so far, once it has expired.
+        Returns the tour; per-move counters are left in self.stats.
+        """
+        for name in chain:
+            if name not in self.MOVES:
+                raise ValueError(f"Unknown neighborhood: {name}")
+        if len(self.tour) < 5:
+            return self.tour
+
+        size = self.graph.num_nodes + 1
+        if active is None:
+            queues = {name: deque(self.tour) for name in chain}
+            queued = {name: [True] * size for name in chain}
+        else:
+            active = [v for v in dict.fromkeys(active) if v in self.tour]
+            queues = {name: deque(active) for name in chain}
+            queued = {name: [False] * size for name in chain}
+            for flags in queued.values():
+                for v in active:
+                    flags[v] = True
+        for name in chain:
+            self.stats[name] = {"evaluations": 0, "improvements": 0, "time": 0.0}
+
+        level = 0
+        while level < len(chain) and not (budget is not None and budget.expired()):
+            name = chain[level]
+            move = getattr(self, self.MOVES[name])
+            queue, flags = queues[name], queued[name]
+            improved = False
+
+            self.evaluations = 0
+            improvements = 0
+            started = time.perf_counter()
+            with profiling.span(name):
+                while queue:
+                    if budget is not None and budget.expired():
+                        break
+                    a = queue.popleft()
+                    flags[a] = False
+                    touched = move(a)
+                    if touched is None:
+                        continue
+
+                    improved = True
+                    improvements += 1
+                    # Every neighborhood has to look at these vertices again
+                    for other in chain:
+                        other_queue, other_flags = queues[other], queued[other]
+                        for v in touched:
+                            if not other_flags[v]:
+                                other_flags[v] = True
+                                other_queue.append(v)
+
+            self.stats[name]["time"] += time.perf_counter() - started
+            self.stats[name]["evaluations"] += self.evaluations
+            self.stats[name]["improvements"] += improvements
+            profiling.count(f"local_search.{name}.evaluations", self.evaluations)
+            profiling.count(f"local_search.{name}.improvements", improvements)
+
+            level = 0 if improved and level > 0 else level + 1
+
+        for entry in self.stats.values():
+            entry["evals_per_sec"] = entry["evaluations"] / entry["time"] if entry["time"] > 0 else 0.0
+
+        return self.tour
+
+# ---------------------------
+# Entry points
+# ---------------------------
+def two_opt_candidates(graph, tour, k=CANDIDATES, candidates=None):
+    """
+    2-opt restricted to candidate edges.
+
+    For every active vertex a and both tour neighbors b of a, only new
+    edges (a, c) with c in a's candidate list and w(a, c) < w(a, b) are
+    tried. Vertices whose neighborhood produced no move get their
+    don't-look bit set and leave the queue; the endpoints of every applied
+    move are queued again. Returns the improved tour as a new Tour.
+    """
+    return LocalSearch(graph, tour, candidates, k).run(("2opt",))
+
+def local_search(graph, tour, chain=DEFAULT_CHAIN, k=CANDIDATES, candidates=None,
+                 time_budget=None, budget=None):
+    """
+    Improve tour with the neighborhoods in chain (any of "2opt", "oropt",
+    "3opt", in the order given). Returns (tour, stats) where stats maps
+    each neighborhood to its evaluations, improvements, time and
+    evaluations per second. Once time_budget seconds have passed the tour
+    as improved so far is returned.
+    """
+    budget = as_budget(time_budget, None, "local_search", budget)
+    with profiling.span("local_search"):
+        with profiling.span("candidates"):
+            search = LocalSearch(graph, tour, candidates, k)
+        improved = search.run(tuple(chain), budget=budget)
+    return improved, search.stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Neighbor-list local search on a large random instance.")
+    parser.add_argument("-n", "--nodes", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-k", "--candidates", type=int, default=CANDIDATES)
+    parser.add_argument("--chain", default=",".join(DEFAULT_CHAIN),
+                        help="comma separated neighborhoods, e.g. 2opt,oropt,3opt")
+    args = parser.parse_args()
+
+    g = randomWeightedCompleteBulk(args.nodes, seed=args.seed, dtype=np.float32)
+    t0 = time.perf_counter()
+    start_tour = nearest_neighbor(g, 1)
+    t1 = time.perf_counter()
+    improved, stats = local_search(g, start_tour, args.chain.split(","), args.candidates)
+    t2 = time.perf_counter()
+
+    print(f"Nodes          : {args.nodes}")
+    print(f"NN cost        : {tour_cost(g, start_tour):.4f} ({t1 - t0:.2f}s)")
+    print(f"Improved cost  : {tour_cost(g, improved):.4f} ({t2 - t1:.2f}s)")
+    for name, entry in stats.items():
+        print(f"  {name:6} {entry['improvements']:8} moves {entry['evaluations']:10} evals "
+              f"{entry['evals_per_sec']:12.0f} evals/s")
+
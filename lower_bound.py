@@ -0,0 +1,128 @@
+"""
+Held-Karp lower bound: subgradient optimization over 1-trees.
+
+For vertex penalties pi, edge (u, v) costs w[u][v] + pi[u] + pi[v]. Every
+tour then costs exactly 2 * sum(pi) more, while the cheapest 1-tree
+(spanning tree on 2..n plus the two cheapest edges at vertex 1) is still
+no more expensive than a tour. So
+
+    cost(min 1-tree under pi) - 2 * sum(pi)
+
+is a certified lower bound for *any* pi, and the ascent just moves pi
+towards vertices of degree 2 to raise it.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import profiling
+from prims import prim_matrix
+from randomGraph import randomWeightedCompleteBulk
+
+# Subgradient steps used by default
+ASCENT_ITERATIONS = 100
+
+# The step size shrinks by this factor after every step that fails to
+# raise the bound
+STEP_DECAY = 2.0 ** -0.25
+
+# Bounds closer than this are treated as equal
+EPS = 1e-9
+
+def one_tree(W, pi):
+    """
+    Minimum 1-tree under penalties pi on the padded weight array W.
+    Returns (bound, degrees, T): bound is already corrected by 2 * sum(pi),
+    degrees[v] is the degree of v in the 1-tree (index 0 unused) and T is
+    the spanning tree on 2..n as a parent array.
+    """
+    n = W.shape[0] - 1
+    T = prim_matrix(W, range(2, n + 1), pi)
+
+    children = np.arange(3, n + 1)
+    parents = T[3:]
+    tree_cost = float((W[children, parents] + pi[children] + pi[parents]).sum())
+
+    degrees = np.bincount(parents, minlength=n + 1)
+    degrees[children] += 1
+
+    # Attach vertex 1 by its two cheapest penalized edges
+    edges_from_1 = W[1, 2:] + pi[2:] + pi[1]
+    ends = np.argpartition(edges_from_1, 1)[:2]
+    tree_cost += float(edges_from_1[ends].sum())
+    degrees[ends + 2] += 1
+    degrees[1] = 2
+
+    return tree_cost - 2.0 * float(pi.sum()), degrees, T
+
+def held_karp_bound(graph, upper_bound, iterations=ASCENT_ITERATIONS, time_budget=None):
+    """
+    Run the subgradient ascent on graph and return (bound, pi).
+
+    upper_bound is the cost of any known tour (e.g. Christofides or
+    NN + 2-opt); it only sets the step size. The returned bound is the
+    best one seen and is valid regardless of how far the ascent got.
+    pi is indexed by vertex label (pi[0] unused).
+    """
+    W = graph.as_array()
+    n = graph.num_nodes
+    if n < 3:
+        return float(upper_bound), np.zeros(n + 1)
+
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    pi = np.zeros(n + 1)
+    best_bound, best_pi = -np.inf, pi.copy()
+    step_scale = 2.0
+    one_trees = 0
+
+    with profiling.span("lower_bound"):
+        for _ in range(iterations):
+            bound, degrees, _ = one_tree(W, pi)
+            one_trees += 1
+            if bound > best_bound + EPS:
+                best_bound, best_pi = bound, pi.copy()
+            else:
+                step_scale *= STEP_DECAY
+
+            subgradient = degrees - 2
+            subgradient[0] = 0
+            norm = float(subgradient @ subgradient)
+            if norm == 0:
+                break  # the 1-tree is a tour, so the bound is the optimum
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+
+            gap = max(upper_bound - bound, EPS)
+            pi = pi + (step_scale * gap / norm) * subgradient
+
+    profiling.count("lower_bound.one_trees", one_trees)
+    return best_bound, best_pi
+
+def pct_above_bound(cost, bound):
+    """Percentage by which a tour cost exceeds the lower bound."""
+    return (cost - bound) / bound * 100
+
+
+if __name__ == "__main__":
+    from nn_2opt import nn_search
+
+    parser = argparse.ArgumentParser(description="Held-Karp 1-tree lower bound.")
+    parser.add_argument("-n", "--nodes", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=ASCENT_ITERATIONS)
+    args = parser.parse_args()
+
+    g = randomWeightedCompleteBulk(args.nodes, seed=args.seed)
+    nn_path, nn_cost = nn_search(g, start_nodes=1)
+
+    start = time.perf_counter()
+    bound, _ = held_karp_bound(g, nn_cost, args.iterations)
+    elapsed = time.perf_counter() - start
+
+    print(f"Nodes          : {args.nodes}")
+    print(f"NN cost        : {nn_cost:.4f}")
+    print(f"Lower bound    : {bound:.4f}")
+    print(f"NN above bound : {pct_above_bound(nn_cost, bound):.2f}%")
+    print(f"Runtime        : {elapsed:.4f}s ({elapsed / args.iterations:.4f}s per iteration)")
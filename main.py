@@ -1,8 +1,39 @@
 from christofides_v1 import *
 from heldkarp import *
 from nn_2opt import *
+from branch_bound import branch_and_bound
+from lower_bound import held_karp_bound, pct_above_bound
+from local_search import local_search
+from randomGraph import randomWeightedComplete
+import profiling
+import os
+import random
 import time
 
+# From this size on Held-Karp runs on every core (below it the process
+# pool costs more than it saves)
+HELD_KARP_PARALLEL_FROM = 18
+
+# When Held-Karp is skipped, branch-and-bound proves the optimum instead
+# for instances up to this size, within this many seconds
+BRANCH_BOUND_LIMIT = 60
+BRANCH_BOUND_TIME = 30.0
+
+# Starts tried by multi-start NN + 2-opt; from NN_PARALLEL_FROM nodes on
+# every core gets at least one start
+NN_STARTS = 10
+NN_PARALLEL_FROM = 200
+
+# Neighborhoods run after 2-opt (see local_search.py)
+LOCAL_SEARCH_CHAIN = ("2opt", "oropt", "3opt")
+
+# The adjacency matrix is only printed up to this many nodes
+PRINT_MATRIX_LIMIT = 20
+
+# Set TSP_PROFILE=<file.json> to record per-phase spans, counters and peak
+# memory of every solver (see profiling.py)
+PROFILE_PATH = os.environ.get("TSP_PROFILE")
+
 # ------------------------------------------------
 # Pretty formatting functions
 # ------------------------------------------------
@@ -25,11 +56,11 @@ if __name__ == '__main__':
         print(f"Number of nodes set to: {numNodes}")
 
         # Warn about Held-Karp if needed
-        if numNodes > 20:
-            print("\n⚠️  WARNING: Held-Karp is exponential and will be VERY slow for > 20 nodes.")
+        if numNodes > HELD_KARP_LIMIT:
+            print(f"\n⚠️  WARNING: Held-Karp is exponential and will be VERY slow for > {HELD_KARP_LIMIT} nodes.")
             print("What would you like to do?")
             print("1) Run anyway")
-            print("2) Run WITHOUT Held-Karp")
+            print(f"2) Run WITHOUT Held-Karp (branch-and-bound finds the optimum up to {BRANCH_BOUND_LIMIT} nodes)")
             print("3) Change number of nodes")
 
             choice = input("Enter 1, 2, or 3: ").strip()
@@ -49,41 +80,72 @@ if __name__ == '__main__':
             runHeldKarp = True
             break
 
+    if PROFILE_PATH:
+        profiler = profiling.enable(memory=True)
+
     # --------------------------------
     # Generate graph
     # --------------------------------
     g = randomWeightedComplete(numNodes)
-    print("\nAdjacency Matrix:")
-    g.print_graph()
+    if numNodes <= PRINT_MATRIX_LIMIT:
+        print("\nAdjacency Matrix:")
+        g.print_graph()
 
     # --------------------------------
     # Run Christofides
     # --------------------------------
     cf_start = time.time()
-    cf_path, cf_cost = christofides(g)
+    cf_path, cf_cost, cf_stats = christofides_with_stats(g)
     cf_end = time.time()
 
     # --------------------------------
     # Run NN + 2-opt
     # --------------------------------
     nn_start = time.time()
-    nn_path, nn_cost = nn_search(g, start_nodes=min(10, numNodes))
+    nn_workers = os.cpu_count() if numNodes >= NN_PARALLEL_FROM else 1
+    nn_starts = random.sample(range(1, numNodes + 1), k=min(max(NN_STARTS, nn_workers), numNodes))
 
-    # FIXED: Correct parameter order → (graph, tour)
-    improved_tour = two_opt(g, nn_path)
-    improved_cost = tour_cost(g, improved_tour)
+    # Every start gets its own 2-opt (on all cores for large instances)
+    improved_tour, improved_cost, nn_report = nn_two_opt_parallel(g, nn_starts, nn_workers)
+    nn_cost = nn_report["nn_cost"]
     nn_end = time.time()
 
+    # --------------------------------
+    # Continue with Or-opt / 3-opt
+    # --------------------------------
+    ls_start = time.time()
+    ls_tour, ls_stats = local_search(g, improved_tour, LOCAL_SEARCH_CHAIN)
+    ls_cost = tour_cost(g, ls_tour)
+    ls_end = time.time()
+
+    # --------------------------------
+    # Held-Karp (1-tree) lower bound, so quality is known at any size
+    # --------------------------------
+    lb_start = time.time()
+    lower_bound, _ = held_karp_bound(g, min(cf_cost, ls_cost))
+    lb_end = time.time()
+
     # --------------------------------
     # Run Held-Karp (optional)
     # --------------------------------
     if runHeldKarp:
         hk_start = time.time()
-        hk_cost, hk_path = held_karp(numNodes, g.adj_matrix)
+        hk_workers = os.cpu_count() if numNodes >= HELD_KARP_PARALLEL_FROM else None
+        hk_cost, hk_path = held_karp(numNodes, g.adj_matrix, workers=hk_workers)
         hk_end = time.time()
     else:
         hk_cost, hk_path = None, None
 
+    # --------------------------------
+    # Run Branch-and-Bound (when Held-Karp was skipped)
+    # --------------------------------
+    if not runHeldKarp and numNodes <= BRANCH_BOUND_LIMIT:
+        bb_start = time.time()
+        bb_cost, bb_path, bb_info = branch_and_bound(g, time_budget=BRANCH_BOUND_TIME)
+        bb_end = time.time()
+    else:
+        bb_cost, bb_path, bb_info = None, None, None
+
     # --------------------------------
     # Print Results
     # --------------------------------
@@ -92,7 +154,9 @@ print("\n================== RESULTS ==================\n")
 # ---------- Christofides ----------
 print("----- Christofides Algorithm -----")
 print(f"Cost      : {cf_cost}")
-print(f"Path      : {format_path(cf_path)}")
+print(f"Path      : {format_cycle(cf_path)}")
+print(f"Matching  : {cf_stats['matching']}, weight {cf_stats['matching_weight']:.2f}, "
+      f"{cf_stats['matching_time']:.6f} seconds")
 print(f"Runtime   : {cf_end - cf_start:.6f} seconds\n")
 
 # ---------- Nearest Neighbor + 2-opt ----------
@@ -100,19 +164,40 @@ print("----- Nearest Neighbor + 2-opt -----")
 print(f"NN Cost        : {nn_cost}")
 print(f"2-opt Cost     : {improved_cost}")
 
-nn_cycle = improved_tour + [improved_tour[0]]
-print(f"Hamiltonian Cycle: {format_path(nn_cycle)}")
+print(f"Hamiltonian Cycle: {format_cycle(improved_tour)}")
 print(f"Runtime        : {nn_end - nn_start:.6f} seconds\n")
 
+# ---------- Local search chain ----------
+print(f"----- NN + {' → '.join(LOCAL_SEARCH_CHAIN)} -----")
+print(f"Cost           : {ls_cost}")
+print(f"Hamiltonian Cycle: {format_cycle(ls_tour)}")
+for name, entry in ls_stats.items():
+    print(f"  {name:6}: {entry['improvements']} moves, {entry['evaluations']} evaluations, "
+          f"{entry['evals_per_sec']:.0f} evals/s")
+print(f"Runtime        : {nn_end - nn_start + ls_end - ls_start:.6f} seconds\n")
+
 # ---------- Held-Karp ----------
 print("----- Held-Karp Algorithm -----")
 if hk_cost is None:
     print("Held-Karp skipped due to node limit.\n")
 else:
     print(f"Cost      : {hk_cost}")
-    print(f"Path      : {format_path(hk_path)}")
+    print(f"Path      : {format_cycle(hk_path)}")
     print(f"Runtime   : {hk_end - hk_start:.6f} seconds\n")
 
+# ---------- Branch-and-Bound ----------
+if bb_cost is not None:
+    print("----- Branch-and-Bound -----")
+    print(f"Cost      : {bb_cost}")
+    print(f"Path      : {format_cycle(bb_path)}")
+    print(f"Optimal   : {'proven' if bb_info['optimal'] else 'not proven (budget ran out)'}")
+    print(f"Runtime   : {bb_end - bb_start:.6f} seconds\n")
+
+# ---------- Lower bound ----------
+print("----- Held-Karp Lower Bound (1-tree subgradient) -----")
+print(f"Bound     : {lower_bound:.4f}")
+print(f"Runtime   : {lb_end - lb_start:.6f} seconds\n")
+
 print("============== END OF RESULTS ==============\n")
 
 
@@ -123,29 +208,50 @@ print("============== SUMMARY COMPARISON ==============")
 
 # Determine optimal cost for % comparison
 optimal_cost = hk_cost if hk_cost is not None else None
+if optimal_cost is None and bb_cost is not None and bb_info["optimal"]:
+    optimal_cost = bb_cost
 
 def pct_above_opt(cost):
     if optimal_cost is None:
         return "   N/A"
-    return f"{((cost - optimal_cost) / optimal_cost) * 100:7.2f}%"
+    pct = ((cost - optimal_cost) / optimal_cost) * 100
+    if abs(pct) < 0.005:
+        pct = 0.0  # float noise between equal tours, don't print -0.00%
+    return f"{pct:7.2f}%"
+
+def pct_above_lb(cost):
+    if cost != cost:  # NaN for skipped rows
+        return "   N/A"
+    return f"{pct_above_bound(cost, lower_bound):7.2f}%"
 
 # Build rows
 summary_rows = [
     ("Christofides", cf_cost, cf_end - cf_start, pct_above_opt(cf_cost)),
     ("NN + 2-opt", improved_cost, nn_end - nn_start, pct_above_opt(improved_cost)),
+    ("NN + Or/3-opt", ls_cost, nn_end - nn_start + ls_end - ls_start, pct_above_opt(ls_cost)),
     ("Held-Karp" if hk_cost is not None else "Held-Karp (skipped)",
      hk_cost if hk_cost is not None else float('nan'),
      (hk_end - hk_start) if hk_cost is not None else 0,
      "   N/A" if hk_cost is None else pct_above_opt(hk_cost))
 ]
+if bb_cost is not None:
+    summary_rows.append(("Branch-and-Bound", bb_cost, bb_end - bb_start, pct_above_opt(bb_cost)))
 
 # Column headers
-print(f"{'Algorithm':20} {'Cost':10} {'Runtime (s)':15} {'% Above Optimal':15}")
-print("-" * 65)
+print(f"{'Algorithm':20} {'Cost':10} {'Runtime (s)':15} {'% Above Optimal':15} {'% Above Lower Bound':19}")
+print("-" * 85)
 
 # Print aligned rows
 for name, cost, runtime, pct in summary_rows:
     cost_display = f"{cost:.4f}" if cost == cost else "   N/A"  # NaN-safe
-    print(f"{name:20} {cost_display:10} {runtime:15.6f} {pct:15}")
+    print(f"{name:20} {cost_display:10} {runtime:15.6f} {pct:15} {pct_above_lb(cost):19}")
 
 print("\n===============================================\n")
+
+# ---------- Profile ----------
+if PROFILE_PATH:
+    profiling.disable()
+    profiler.write_json(PROFILE_PATH)
+    print("============== PROFILE ==============")
+    print(profiler.report())
+    print(f"\nWritten to {PROFILE_PATH}\n")
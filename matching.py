@@ -0,0 +1,580 @@
+"""
+Minimum-weight perfect matching for Christofides.
+
+max_weight_matching is Edmonds' blossom algorithm with the primal-dual
+bookkeeping of Galil ("Efficient algorithms for finding maximum matching
+in graphs", 1986), O(n^3). Christofides needs the cheapest *perfect*
+matching on the odd-degree MST vertices, which is the maximum-cardinality
+matching that maximizes sum(C - w) for any constant C.
+
+Weights are matched as integers in units of 1 / WEIGHT_SCALE (the random
+graphs round to 0.01), so the duals stay exact. When the blossom search
+runs out of its time budget, greedy nearest-neighbor pairing is used.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+# Seconds the blossom search may take before falling back to greedy
+MATCHING_TIME_BUDGET = 10.0
+
+# Weights are compared in units of 1 / WEIGHT_SCALE
+WEIGHT_SCALE = 100
+
+# Above this many vertices the blossom search only gets the edges to
+# each vertex's MATCHING_NEIGHBORS nearest vertices
+EXACT_MATCHING_LIMIT = 200
+MATCHING_NEIGHBORS = 10
+
+
+class MatchingBudgetExceeded(Exception):
+    """Raised inside the blossom search when its deadline passes."""
+
+
+# ---------------------------
+# Blossom algorithm
+# ---------------------------
+def max_weight_matching(edges, maxcardinality=False, deadline=None):
+    """
+    Maximum-weight matching on a general graph.
+
+    edges: list of (i, j, weight) with vertices 0..n-1 and integer weights
+    maxcardinality: only consider matchings of maximum cardinality
+    deadline: time.perf_counter() value after which MatchingBudgetExceeded
+              is raised (checked once per dual update)
+
+    Returns mate, where mate[i] is the vertex matched to i or -1.
+    """
+    if not edges:
+        return []
+
+    nedge = len(edges)
+    nvertex = 0
+    for i, j, _ in edges:
+        nvertex = max(nvertex, i + 1, j + 1)
+    maxweight = max(0, max(wt for _, _, wt in edges))
+
+    # Edge k has endpoints 2k (vertex i) and 2k + 1 (vertex j);
+    # neighbend[v] lists the remote endpoints of the edges at v
+    endpoint = [edges[p // 2][p % 2] for p in range(2 * nedge)]
+    neighbend = [[] for _ in range(nvertex)]
+    for k, (i, j, _) in enumerate(edges):
+        neighbend[i].append(2 * k + 1)
+        neighbend[j].append(2 * k)
+
+    # mate[v] is the remote endpoint of v's matched edge, -1 if single
+    mate = nvertex * [-1]
+
+    # Labels of top-level blossoms / vertices: 0 free, 1 S (outer), 2 T (inner);
+    # labelend is the endpoint through which the label was reached
+    label = (2 * nvertex) * [0]
+    labelend = (2 * nvertex) * [-1]
+
+    # Ids 0..n-1 are vertices, n..2n-1 are blossoms
+    inblossom = list(range(nvertex))
+    blossomparent = (2 * nvertex) * [-1]
+    blossomchilds = (2 * nvertex) * [None]
+    blossombase = list(range(nvertex)) + nvertex * [-1]
+    blossomendps = (2 * nvertex) * [None]
+
+    # Least-slack edge to a different S-blossom (for delta2 / delta3)
+    bestedge = (2 * nvertex) * [-1]
+    blossombestedges = (2 * nvertex) * [None]
+
+    unusedblossoms = list(range(nvertex, 2 * nvertex))
+
+    # Vertex duals start at maxweight, blossom duals at 0
+    dualvar = nvertex * [maxweight] + nvertex * [0]
+
+    # allowedge[k] is True once edge k has zero slack
+    allowedge = nedge * [False]
+    queue = []
+
+    def slack(k):
+        i, j, wt = edges[k]
+        return dualvar[i] + dualvar[j] - 2 * wt
+
+    def blossom_leaves(b):
+        if b < nvertex:
+            yield b
+        else:
+            for t in blossomchilds[b]:
+                if t < nvertex:
+                    yield t
+                else:
+                    yield from blossom_leaves(t)
+
+    def assign_label(w, t, p):
+        """Label w's top-level blossom t, reached through endpoint p."""
+        b = inblossom[w]
+        label[w] = label[b] = t
+        labelend[w] = labelend[b] = p
+        bestedge[w] = bestedge[b] = -1
+        if t == 1:
+            queue.extend(blossom_leaves(b))
+        elif t == 2:
+            # The mate of a T-blossom's base becomes an S-vertex
+            base = blossombase[b]
+            assign_label(endpoint[mate[base]], 1, mate[base] ^ 1)
+
+    def scan_blossom(v, w):
+        """Trace back from v and w; return the base of a new blossom or -1 for an augmenting path."""
+        path = []
+        base = -1
+        while v != -1 or w != -1:
+            b = inblossom[v]
+            if label[b] & 4:
+                base = blossombase[b]
+                break
+            path.append(b)
+            label[b] = 5
+            if labelend[b] == -1:
+                v = -1  # reached a single vertex, stop this side
+            else:
+                v = endpoint[labelend[b]]
+                b = inblossom[v]
+                v = endpoint[labelend[b]]
+            if w != -1:
+                v, w = w, v
+        for b in path:
+            label[b] = 1
+        return base
+
+    def add_blossom(base, k):
+        """Contract the odd cycle closed by edge k into a new S-blossom with the given base."""
+        v, w, _ = edges[k]
+        bb = inblossom[base]
+        bv = inblossom[v]
+        bw = inblossom[w]
+        b = unusedblossoms.pop()
+        blossombase[b] = base
+        blossomparent[b] = -1
+        blossomparent[bb] = b
+        blossomchilds[b] = path = []
+        blossomendps[b] = endps = []
+
+        while bv != bb:
+            blossomparent[bv] = b
+            path.append(bv)
+            endps.append(labelend[bv])
+            v = endpoint[labelend[bv]]
+            bv = inblossom[v]
+        path.append(bb)
+        path.reverse()
+        endps.reverse()
+        endps.append(2 * k)
+
+        while bw != bb:
+            blossomparent[bw] = b
+            path.append(bw)
+            endps.append(labelend[bw] ^ 1)
+            w = endpoint[labelend[bw]]
+            bw = inblossom[w]
+
+        label[b] = 1
+        labelend[b] = labelend[bb]
+        dualvar[b] = 0
+        for v in blossom_leaves(b):
+            if label[inblossom[v]] == 2:
+                # Former T-vertices are S-vertices now
+                queue.append(v)
+            inblossom[v] = b
+
+        # Least-slack edges from the new blossom to every other S-blossom
+        bestedgeto = (2 * nvertex) * [-1]
+        for bv in path:
+            if blossombestedges[bv] is None:
+                nblists = [[p // 2 for p in neighbend[v]] for v in blossom_leaves(bv)]
+            else:
+                nblists = [blossombestedges[bv]]
+            for nblist in nblists:
+                for k in nblist:
+                    i, j, _ = edges[k]
+                    if inblossom[j] == b:
+                        i, j = j, i
+                    bj = inblossom[j]
+                    if (bj != b and label[bj] == 1 and
+                            (bestedgeto[bj] == -1 or slack(k) < slack(bestedgeto[bj]))):
+                        bestedgeto[bj] = k
+            blossombestedges[bv] = None
+            bestedge[bv] = -1
+        blossombestedges[b] = [k for k in bestedgeto if k != -1]
+        bestedge[b] = -1
+        for k in blossombestedges[b]:
+            if bestedge[b] == -1 or slack(k) < slack(bestedge[b]):
+                bestedge[b] = k
+
+    def expand_blossom(b, endstage):
+        """Undo blossom b; mid-stage, relabel the children of a T-blossom along its alternating path."""
+        for s in blossomchilds[b]:
+            blossomparent[s] = -1
+            if s < nvertex:
+                inblossom[s] = s
+            elif endstage and dualvar[s] == 0:
+                expand_blossom(s, endstage)
+            else:
+                for v in blossom_leaves(s):
+                    inblossom[v] = s
+
+        if not endstage and label[b] == 2:
+            entrychild = inblossom[endpoint[labelend[b] ^ 1]]
+            j = blossomchilds[b].index(entrychild)
+            if j & 1:
+                # Go forward and wrap around
+                j -= len(blossomchilds[b])
+                jstep = 1
+                endptrick = 0
+            else:
+                jstep = -1
+                endptrick = 1
+
+            p = labelend[b]
+            while j != 0:
+                label[endpoint[p ^ 1]] = 0
+                label[endpoint[blossomendps[b][j - endptrick] ^ endptrick ^ 1]] = 0
+                assign_label(endpoint[p ^ 1], 2, p)
+                allowedge[blossomendps[b][j - endptrick] // 2] = True
+                j += jstep
+                p = blossomendps[b][j - endptrick] ^ endptrick
+                allowedge[p // 2] = True
+                j += jstep
+
+            # The base child becomes a T-blossom without relabeling its mate
+            bv = blossomchilds[b][j]
+            label[endpoint[p ^ 1]] = label[bv] = 2
+            labelend[endpoint[p ^ 1]] = labelend[bv] = p
+            bestedge[bv] = -1
+
+            # Children off the path get labels only if one of their vertices had one
+            j += jstep
+            while blossomchilds[b][j] != entrychild:
+                bv = blossomchilds[b][j]
+                if label[bv] == 1:
+                    j += jstep
+                    continue
+                for v in blossom_leaves(bv):
+                    if label[v] != 0:
+                        break
+                if label[v] != 0:
+                    label[v] = 0
+                    label[endpoint[mate[blossombase[bv]]]] = 0
+                    assign_label(v, 2, labelend[v])
+                j += jstep
+
+        label[b] = labelend[b] = -1
+        blossomchilds[b] = blossomendps[b] = None
+        blossombase[b] = -1
+        blossombestedges[b] = None
+        bestedge[b] = -1
+        unusedblossoms.append(b)
+
+    def augment_blossom(b, v):
+        """Swap matched and unmatched edges along the path from v to the base of b; v becomes the base."""
+        t = v
+        while blossomparent[t] != b:
+            t = blossomparent[t]
+        if t >= nvertex:
+            augment_blossom(t, v)
+
+        i = j = blossomchilds[b].index(t)
+        if i & 1:
+            j -= len(blossomchilds[b])
+            jstep = 1
+            endptrick = 0
+        else:
+            jstep = -1
+            endptrick = 1
+
+        while j != 0:
+            j += jstep
+            t = blossomchilds[b][j]
+            p = blossomendps[b][j - endptrick] ^ endptrick
+            if t >= nvertex:
+                augment_blossom(t, endpoint[p])
+            j += jstep
+            t = blossomchilds[b][j]
+            if t >= nvertex:
+                augment_blossom(t, endpoint[p ^ 1])
+            mate[endpoint[p]] = p ^ 1
+            mate[endpoint[p ^ 1]] = p
+
+        # Rotate so the new base comes first
+        blossomchilds[b] = blossomchilds[b][i:] + blossomchilds[b][:i]
+        blossomendps[b] = blossomendps[b][i:] + blossomendps[b][:i]
+        blossombase[b] = blossombase[blossomchilds[b][0]]
+
+    def augment_matching(k):
+        """Flip the augmenting path through edge k (between two S-vertices)."""
+        v, w, _ = edges[k]
+        for s, p in ((v, 2 * k + 1), (w, 2 * k)):
+            while True:
+                bs = inblossom[s]
+                if bs >= nvertex:
+                    augment_blossom(bs, s)
+                mate[s] = p
+                if labelend[bs] == -1:
+                    break  # reached a single vertex
+                t = endpoint[labelend[bs]]
+                bt = inblossom[t]
+                s = endpoint[labelend[bt]]
+                j = endpoint[labelend[bt] ^ 1]
+                if bt >= nvertex:
+                    augment_blossom(bt, j)
+                mate[j] = labelend[bt]
+                p = labelend[bt] ^ 1
+
+    # Each stage looks for one augmenting path
+    for _ in range(nvertex):
+        label[:] = (2 * nvertex) * [0]
+        bestedge[:] = (2 * nvertex) * [-1]
+        blossombestedges[nvertex:] = nvertex * [None]
+        allowedge[:] = nedge * [False]
+        queue[:] = []
+
+        for v in range(nvertex):
+            if mate[v] == -1 and label[inblossom[v]] == 0:
+                assign_label(v, 1, -1)
+
+        augmented = False
+        while True:
+            if deadline is not None and time.perf_counter() > deadline:
+                raise MatchingBudgetExceeded
+
+            # Grow the alternating forest from the S-vertices in the queue
+            while queue and not augmented:
+                v = queue.pop()
+                for p in neighbend[v]:
+                    k = p // 2
+                    w = endpoint[p]
+                    if inblossom[v] == inblossom[w]:
+                        continue
+                    if not allowedge[k]:
+                        kslack = slack(k)
+                        if kslack <= 0:
+                            allowedge[k] = True
+
+                    if allowedge[k]:
+                        if label[inblossom[w]] == 0:
+                            assign_label(w, 2, p ^ 1)
+                        elif label[inblossom[w]] == 1:
+                            base = scan_blossom(v, w)
+                            if base >= 0:
+                                add_blossom(base, k)
+                            else:
+                                augment_matching(k)
+                                augmented = True
+                                break
+                        elif label[w] == 0:
+                            # w is inside a T-blossom but not yet reached
+                            label[w] = 2
+                            labelend[w] = p ^ 1
+                    elif label[inblossom[w]] == 1:
+                        b = inblossom[v]
+                        if bestedge[b] == -1 or kslack < slack(bestedge[b]):
+                            bestedge[b] = k
+                    elif label[w] == 0:
+                        if bestedge[w] == -1 or kslack < slack(bestedge[w]):
+                            bestedge[w] = k
+
+            if augmented:
+                break
+
+            # No tight edge left: pick the smallest dual change that makes progress
+            deltatype = -1
+            delta = deltaedge = deltablossom = None
+
+            if not maxcardinality:
+                deltatype = 1
+                delta = min(dualvar[:nvertex])
+
+            for v in range(nvertex):
+                if label[inblossom[v]] == 0 and bestedge[v] != -1:
+                    d = slack(bestedge[v])
+                    if deltatype == -1 or d < delta:
+                        delta, deltatype, deltaedge = d, 2, bestedge[v]
+
+            for b in range(2 * nvertex):
+                if blossomparent[b] == -1 and label[b] == 1 and bestedge[b] != -1:
+                    d = slack(bestedge[b]) // 2
+                    if deltatype == -1 or d < delta:
+                        delta, deltatype, deltaedge = d, 3, bestedge[b]
+
+            for b in range(nvertex, 2 * nvertex):
+                if (blossombase[b] >= 0 and blossomparent[b] == -1 and label[b] == 2 and
+                        (deltatype == -1 or dualvar[b] < delta)):
+                    delta, deltatype, deltablossom = dualvar[b], 4, b
+
+            if deltatype == -1:
+                # Maximum cardinality reached; finish with a plain dual step
+                deltatype = 1
+                delta = max(0, min(dualvar[:nvertex]))
+
+            for v in range(nvertex):
+                if label[inblossom[v]] == 1:
+                    dualvar[v] -= delta
+                elif label[inblossom[v]] == 2:
+                    dualvar[v] += delta
+            for b in range(nvertex, 2 * nvertex):
+                if blossombase[b] >= 0 and blossomparent[b] == -1:
+                    if label[b] == 1:
+                        dualvar[b] += delta
+                    elif label[b] == 2:
+                        dualvar[b] -= delta
+
+            if deltatype == 1:
+                break  # optimum reached
+            elif deltatype == 2:
+                allowedge[deltaedge] = True
+                i, j, _ = edges[deltaedge]
+                if label[inblossom[i]] == 0:
+                    i, j = j, i
+                queue.append(i)
+            elif deltatype == 3:
+                allowedge[deltaedge] = True
+                i, j, _ = edges[deltaedge]
+                queue.append(i)
+            elif deltatype == 4:
+                expand_blossom(deltablossom, False)
+
+        if not augmented:
+            break
+
+        # End of stage: expand S-blossoms whose dual dropped to zero
+        for b in range(nvertex, 2 * nvertex):
+            if (blossomparent[b] == -1 and blossombase[b] >= 0 and
+                    label[b] == 1 and dualvar[b] == 0):
+                expand_blossom(b, True)
+
+    for v in range(nvertex):
+        if mate[v] >= 0:
+            mate[v] = endpoint[mate[v]]
+    return mate
+
+
+# ---------------------------
+# Matchings on graph vertices
+# ---------------------------
+def greedy_matching(graph, odd_degree_vertices):
+    """
+    Compute a greedy minimum-weight perfect matching on the odd-degree vertices. Returns a list of edges (u,v)
+    """
+
+    # vertices we still need to match 
+    unmatched = set(odd_degree_vertices)
+
+    matching = []
+
+    # There should always be an even number of odd vertices in a graph
+    assert len(unmatched) % 2 == 0, "The number of odd-degree vertices has to be even"
+
+    while unmatched:
+        v = unmatched.pop()     # Take one odd vertex from the list
+
+        # Find the nearest neighbor among the remaing unmatched odd vertices
+        candidates = np.fromiter(unmatched, dtype=np.intp, count=len(unmatched))
+        best_u = int(candidates[np.argmin(graph.row(v)[candidates])])
+
+
+        # Pair v with its nearest neighbor
+        unmatched.remove(best_u)
+        matching.append((v, best_u))
+
+    return matching
+
+def matching_weight(graph, matching):
+    return float(sum(graph.weight(u, v) for u, v in matching))
+
+def candidate_pairs(W, neighbors):
+    """
+    Index pairs (i < j) of the complete graph on W's rows, or, when
+    neighbors is set, only those where one end is among the other's
+    `neighbors` nearest.
+    """
+    k = W.shape[0]
+    if neighbors is None or neighbors >= k - 1:
+        return np.triu_indices(k, 1)
+
+    ranked = W.astype(np.float64)
+    np.fill_diagonal(ranked, np.inf)
+    nearest = np.argpartition(ranked, neighbors - 1, axis=1)[:, :neighbors]
+    rows = np.repeat(np.arange(k), neighbors)
+    cols = nearest.ravel()
+    pairs = np.unique(np.minimum(rows, cols) * k + np.maximum(rows, cols))
+    return pairs // k, pairs % k
+
+def min_weight_perfect_matching(graph, vertices, time_budget=MATCHING_TIME_BUDGET,
+                                neighbors=MATCHING_NEIGHBORS):
+    """
+    Cheapest perfect matching of `vertices` (an even number of them) by
+    the blossom algorithm.
+
+    Up to EXACT_MATCHING_LIMIT vertices all pairs are considered, so the
+    result is optimal. Larger sets only offer each vertex its `neighbors`
+    nearest (neighbors=None forces the exact search); the few vertices
+    that sparse graph leaves single are paired greedily. If the search
+    does not finish within time_budget seconds (None for no limit),
+    greedy_matching is used for the whole set instead.
+
+    Returns (matching, info): matching is a list of (u, v) pairs and
+    info = {"method": "blossom" | "sparse blossom" | "greedy",
+            "time": float, "weight": float}.
+    """
+    started = time.perf_counter()
+    vertices = list(vertices)
+    k = len(vertices)
+    assert k % 2 == 0, "The number of vertices to match has to be even"
+    if k <= EXACT_MATCHING_LIMIT:
+        neighbors = None
+
+    idx = np.asarray(vertices, dtype=np.intp)
+    W = np.rint(graph.as_array()[np.ix_(idx, idx)] * WEIGHT_SCALE).astype(np.int64)
+
+    # Maximize C - w over maximum-cardinality matchings = minimize w
+    top = int(W.max()) + 1 if k else 0
+    iu, ju = candidate_pairs(W, neighbors)
+    edges = list(zip(iu.tolist(), ju.tolist(), (top - W[iu, ju]).tolist()))
+
+    deadline = None if time_budget is None else started + time_budget
+    try:
+        mate = max_weight_matching(edges, maxcardinality=True, deadline=deadline)
+        mate += [-1] * (k - len(mate))
+        matching = [(vertices[i], vertices[j]) for i, j in enumerate(mate) if i < j]
+        single = [vertices[i] for i, j in enumerate(mate) if j == -1]
+        matching += greedy_matching(graph, single)
+        method = "blossom" if neighbors is None else "sparse blossom"
+    except MatchingBudgetExceeded:
+        matching = greedy_matching(graph, vertices)
+        method = "greedy"
+
+    info = {
+        "method": method,
+        "time": time.perf_counter() - started,
+        "weight": matching_weight(graph, matching),
+    }
+    return matching, info
+
+
+if __name__ == "__main__":
+    from christofides_v1 import odd_degree_vertices
+    from prims import Prim
+    from randomGraph import randomWeightedCompleteBulk
+
+    parser = argparse.ArgumentParser(description="Blossom vs greedy matching on the odd MST vertices.")
+    parser.add_argument("-n", "--nodes", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--time-budget", type=float, default=MATCHING_TIME_BUDGET)
+    args = parser.parse_args()
+
+    g = randomWeightedCompleteBulk(args.nodes, seed=args.seed)
+    odd = odd_degree_vertices(Prim(g), args.nodes)
+
+    start = time.perf_counter()
+    greedy = greedy_matching(g, odd)
+    greedy_time = time.perf_counter() - start
+    _, info = min_weight_perfect_matching(g, odd, args.time_budget)
+
+    print(f"Odd vertices   : {len(odd)}")
+    print(f"Greedy         : weight {matching_weight(g, greedy):.2f} ({greedy_time:.4f}s)")
+    print(f"{info['method'].capitalize():15}: weight {info['weight']:.2f} ({info['time']:.4f}s)")
@@ -1,9 +1,18 @@
+from concurrent.futures import ProcessPoolExecutor
 import argparse
+import os
 import random
 import time
 import math
 
+import numpy as np
+
+import profiling
+from budget import as_budget
 from randomGraph import randomWeightedComplete as generate_graph
+from shared_arrays import attach_shared, release_shared, share_array
+from tour import Tour, as_tour
+from weightedGraph import WeightedGraph
 # If you want pure random weights instead:
 # from randomCompleteWeightedGraph import randomWeightedComplete as generate_graph
 
@@ -15,9 +24,14 @@ def nodes_list(graph):
     return list(range(1, graph.num_nodes + 1))
 
 def w(graph, u, v):
-    return graph.adj_matrix[u][v]
+    return graph.weight(u, v)
 
 def tour_cost(graph, tour):
+    if graph.is_array():
+        # Gather every consecutive pair from the raw buffer in one go
+        t = np.asarray(tour, dtype=np.intp)
+        return float(graph.adj_matrix[t, np.roll(t, -1)].sum(dtype=np.float64))
+
     total = 0.0
     n = len(tour)
     for i in range(n):
@@ -41,26 +55,57 @@ def assert_symmetric_complete(graph):
 # ---------------------------
 # Nearest Neighbor
 # ---------------------------
-def nearest_neighbor(graph, start=1):
+def nearest_neighbor(graph, start=1, W=None):
+    """
+    Greedy tour from start. Each step is one masked argmin over the last
+    vertex's row of the weight matrix: visited vertices carry an infinite
+    penalty, so no Python-level scan over the unvisited set is needed.
+    W (graph.as_array()) can be passed in when building many tours on
+    one graph, which saves the list-to-array copy in list mode.
+    Lazy graphs build the same tour with their grid search.
+    """
+    if graph.is_lazy():
+        return Tour(graph.nearest_neighbor(start), graph.num_nodes)
+    if W is None:
+        W = graph.as_array()
     n = graph.num_nodes
-    unvisited = set(range(1, n + 1))
-    tour = [start]
-    unvisited.remove(start)
 
-    while unvisited:
-        last = tour[-1]
-        nxt = min(unvisited, key=lambda u: w(graph, last, u))
-        tour.append(nxt)
-        unvisited.remove(nxt)
-    return tour
+    penalty = np.zeros(n + 1)
+    penalty[0] = math.inf  # padding column
+    penalty[start] = math.inf
+    candidates = np.empty(n + 1)
+
+    tour = [start]
+    last = start
+    for _ in range(n - 1):
+        np.add(W[last], penalty, out=candidates)
+        last = int(np.argmin(candidates))
+        penalty[last] = math.inf
+        tour.append(last)
+    return Tour(tour, n)
 
 
 # ---------------------------
 # 2-opt
 # ---------------------------
-def two_opt(graph, tour):
+def two_opt(graph, tour, time_budget=None, progress=None, budget=None):
+    """
+    Exhaustive first-improvement 2-opt. Accepts a Tour or a list and
+    returns the improved Tour (a Tour argument is improved in place, in
+    both storage modes). Moves go through Tour.reverse, which flips the
+    shorter side of the cycle.
+
+    Anytime: once time_budget seconds have passed, the tour as improved
+    so far is returned. progress (see budget.py) gets the starting cost
+    and the cost after every full pass.
+    """
+    budget = as_budget(time_budget, progress, "two_opt", budget)
+    tour = as_tour(tour, graph.num_nodes)
     n = len(tour)
     improved = True
+    # Kept up to date move by move for the progress reports
+    cost = tour_cost(graph, tour)
+    budget.improve(cost)
 
     def gain(i, k):
         a, b = tour[i - 1], tour[i]
@@ -69,16 +114,73 @@ def two_opt(graph, tour):
         new_cost = w(graph, a, c) + w(graph, b, d)
         return old_cost - new_cost  # positive = improvement
 
-    while improved:
+    with profiling.span("two_opt"):
+        if graph.is_array():
+            return _two_opt_array(graph.adj_matrix, tour, budget, cost)
+
+        evaluations = improvements = 0
+        while improved and not budget.expired():
+            improved = False
+            for i in range(1, n - 1):
+                if budget.expired():
+                    break
+                for k in range(i + 1, n):
+                    if k == i + 1:
+                        continue
+                    evaluations += 1
+                    g = gain(i, k)
+                    if g > 1e-12:
+                        tour.reverse(i, k - 1)
+                        cost -= g
+                        improvements += 1
+                        improved = True
+            budget.improve(cost)
+
+        profiling.count("two_opt.evaluations", evaluations)
+        profiling.count("two_opt.improvements", improvements)
+        return tour
+
+
+def _two_opt_array(D, tour, budget, cost):
+    """
+    Same first-improvement scan as two_opt, so both storage modes make the
+    same moves: for a fixed i the gains of the remaining k are computed in
+    one vectorized expression against the raw matrix, the first improving
+    k is applied (with tour.reverse) and the scan goes on after it on the
+    changed tour. t is a view of tour.order, so it always sees the moves.
+    """
+    n = len(tour)
+    t = np.frombuffer(tour.order, dtype=np.intc)
+    improved = True
+    evaluations = improvements = 0
+
+    while improved and not budget.expired():
         improved = False
         for i in range(1, n - 1):
-            for k in range(i + 1, n):
-                if k == i + 1:
-                    continue
-                g = gain(i, k)
-                if g > 1e-12:
-                    tour[i:k] = reversed(tour[i:k])
-                    improved = True
+            if budget.expired():
+                break
+            k = i + 2
+            while k < n:
+                ks = np.arange(k, n)
+                a, b = t[i - 1], t[i]
+                c, d = t[ks - 1], t[ks % n]
+                gains = (D[a, b] + D[c, d]) - (D[a, c] + D[b, d])
+                hits = np.flatnonzero(gains > 1e-12)
+                if hits.size == 0:
+                    evaluations += ks.size
+                    break
+                first = int(hits[0])
+                evaluations += first + 1
+                k = int(ks[first])
+                tour.reverse(i, k - 1)
+                cost -= float(gains[first])
+                improvements += 1
+                improved = True
+                k += 1
+        budget.improve(cost)
+
+    profiling.count("two_opt.evaluations", evaluations)
+    profiling.count("two_opt.improvements", improvements)
     return tour
 
 
@@ -90,10 +192,11 @@ def nn_multistart(graph, starts=None):
         starts = nodes_list(graph)
 
     best_tour = None
+    W = graph.as_array()
     best_cost = math.inf
 
     for s in starts:
-        t = nearest_neighbor(graph, start=s)
+        t = nearest_neighbor(graph, start=s, W=W)
         c = tour_cost(graph, t)
         if c < best_cost:
             best_cost = c
@@ -101,6 +204,113 @@ def nn_multistart(graph, starts=None):
     return best_tour, best_cost
 
 
+# ---------------------------
+# Parallel multi-start NN + 2-opt
+# ---------------------------
+# Graph mapped once per worker by _attach_graph
+_worker_graph = None
+
+def _attach_graph(spec):
+    global _worker_graph
+    shm, matrix = attach_shared(spec)
+    # The block is shared with the parent and every other worker
+    matrix.setflags(write=False)
+    # Keep the SharedMemory handle alive as long as the graph
+    _worker_graph = (shm, WeightedGraph.from_array(matrix))
+
+def _map_graph(spec):
+    global _worker_graph
+    filename, offset, shape, dtype = spec
+    matrix = np.memmap(filename, dtype=np.dtype(dtype), mode="r", offset=offset, shape=shape)
+    _worker_graph = (None, WeightedGraph.from_array(matrix))
+
+def _set_graph(graph):
+    global _worker_graph
+    _worker_graph = (None, graph)
+
+def _nn_two_opt(graph, start):
+    """NN from start, then two_opt. Returns (start, tour, nn_cost, cost, pid, nn_time, two_opt_time)."""
+    t0 = time.perf_counter()
+    tour = nearest_neighbor(graph, start)
+    nn_cost = tour_cost(graph, tour)
+    t1 = time.perf_counter()
+    tour = two_opt(graph, tour)
+    t2 = time.perf_counter()
+    return start, tour.tolist(), nn_cost, tour_cost(graph, tour), os.getpid(), t1 - t0, t2 - t1
+
+def _nn_two_opt_task(start):
+    _, graph = _worker_graph
+    return _nn_two_opt(graph, start)
+
+def nn_two_opt_parallel(graph, starts=None, workers=None):
+    """
+    Multi-start NN where every start gets its own two_opt, fanned out
+    over a process pool. The weight matrix is copied once into shared
+    memory and mapped read-only by each worker (a matrix loaded with
+    graph_io.load_graph is mapped from its file instead, with no copy at
+    all); tasks only carry the start vertex, and workers see the graph in
+    array mode (so two_opt takes its vectorized path). workers=1 runs
+    everything in this process.
+
+    Returns (best_tour, best_cost, report): best_tour is the best
+    improved Tour, report holds the best NN cost before 2-opt, the wall
+    time and per-worker {"tasks", "nn_time", "two_opt_time"} keyed by pid.
+    """
+    if starts is None:
+        starts = nodes_list(graph)
+    starts = list(starts)
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(starts))
+
+    started = time.perf_counter()
+    with profiling.span("nn_two_opt"):
+        if workers <= 1:
+            # Same array-mode view the workers get, so results match the pool
+            view = graph if graph.is_lazy() else WeightedGraph.from_array(graph.as_array())
+            results = [_nn_two_opt(view, s) for s in starts]
+        elif graph.is_lazy():
+            # A lazy graph is only its coordinates; send it to each worker once
+            with ProcessPoolExecutor(max_workers=workers, initializer=_set_graph,
+                                     initargs=(graph,)) as pool:
+                chunk = max(1, len(starts) // (4 * workers))
+                results = list(pool.map(_nn_two_opt_task, starts, chunksize=chunk))
+        elif isinstance(graph.as_array(), np.memmap):
+            # Already on disk: every worker maps the same file
+            W = graph.as_array()
+            spec = (W.filename, W.offset, W.shape, W.dtype.str)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_map_graph,
+                                     initargs=(spec,)) as pool:
+                chunk = max(1, len(starts) // (4 * workers))
+                results = list(pool.map(_nn_two_opt_task, starts, chunksize=chunk))
+        else:
+            # Counters inside the workers are not collected, only this span
+            shm, _, spec = share_array(graph.as_array())
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_attach_graph,
+                                         initargs=(spec,)) as pool:
+                    chunk = max(1, len(starts) // (4 * workers))
+                    results = list(pool.map(_nn_two_opt_task, starts, chunksize=chunk))
+            finally:
+                release_shared(shm)
+
+    per_worker = {}
+    for _, _, _, _, pid, nn_time, opt_time in results:
+        entry = per_worker.setdefault(pid, {"tasks": 0, "nn_time": 0.0, "two_opt_time": 0.0})
+        entry["tasks"] += 1
+        entry["nn_time"] += nn_time
+        entry["two_opt_time"] += opt_time
+
+    best = min(results, key=lambda r: r[3])
+    report = {
+        "starts": len(starts),
+        "workers": workers,
+        "nn_cost": min(r[2] for r in results),
+        "wall_time": time.perf_counter() - started,
+        "per_worker": per_worker,
+    }
+    return Tour(best[1], graph.num_nodes), best[3], report
+
+
 # ---------------------------
 # Pretty print Hamiltonian cycle
 # ---------------------------
@@ -117,6 +327,10 @@ def main():
     parser.add_argument("-n", "--nodes", type=int, default=60)
     parser.add_argument("--seed", type=int, default=42)
     parser.add_argument("--starts", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="run NN + 2-opt from every start on this many processes")
+    parser.add_argument("--chain", default="",
+                        help="neighborhoods to run after 2-opt, e.g. oropt,3opt or 2opt,oropt,3opt")
     args = parser.parse_args()
 
     random.seed(args.seed)
@@ -131,6 +345,26 @@ def main():
     else:
         start_nodes = random.sample(all_nodes, k=args.starts)
 
+    if args.workers:
+        # Every start gets its own 2-opt, spread over the pool
+        t0 = time.time()
+        improved_tour, improved_cost, report = nn_two_opt_parallel(g, start_nodes, args.workers)
+        t2 = time.time()
+
+        print(f"\n=== TSP via parallel multi-start NN + 2-opt ===")
+        print(f"Nodes              : {args.nodes}")
+        print(f"Start nodes tried  : {report['starts']}")
+        print(f"Workers            : {report['workers']}")
+        print(f"Best NN cost       : {report['nn_cost']:.4f}")
+        print(f"Best 2-opt cost    : {improved_cost:.4f}")
+        print(f"Hamiltonian cycle:\n{print_cycle(improved_tour)}")
+        print(f"Runtime: {(t2 - t0):.4f}s")
+        for pid, entry in report["per_worker"].items():
+            print(f"  worker {pid}: {entry['tasks']} starts, NN {entry['nn_time']:.4f}s, "
+                  f"2-opt {entry['two_opt_time']:.4f}s")
+        print()
+        return
+
     # Nearest Neighbor
     t0 = time.time()
     nn_tour, nn_cost_open = nn_multistart(g, start_nodes)
@@ -158,29 +392,58 @@ def main():
     print(f"Runtime: {(t2 - t1):.4f}s")
     print(f"Improvement: {nn_cost - improved_cost:.4f}\n")
 
+    # Optional neighborhood chain (Or-opt, 3-opt segment insertion, ...)
+    if args.chain:
+        from local_search import local_search
+
+        t3 = time.time()
+        chained_tour, stats = local_search(g, improved_tour, args.chain.split(","))
+        chained_cost = tour_cost(g, chained_tour)
+        t4 = time.time()
+
+        print(f"--- After {args.chain} ---")
+        print(f"Cost: {chained_cost:.4f}")
+        print(f"Hamiltonian cycle:\n{print_cycle(chained_tour)}")
+        print(f"Runtime: {(t4 - t3):.4f}s")
+        for name, entry in stats.items():
+            print(f"  {name:6}: {entry['improvements']} moves, {entry['evaluations']} evaluations, "
+                  f"{entry['evals_per_sec']:.0f} evals/s")
+        print(f"Improvement: {improved_cost - chained_cost:.4f}\n")
+
 
 if __name__ == "__main__":
     main()
 
 
-def nn_search(graph, start_nodes=10):
+def nn_search(graph, start_nodes=10, time_budget=None, progress=None, budget=None):
     """
     Wrapper for Nearest Neighbor implementation.
     Returns (best_path, best_cost).
+    Once time_budget seconds have passed no further starts are tried (the
+    first always runs); progress gets every new best cost (see budget.py).
     """
+    budget = as_budget(time_budget, progress, "nn_search", budget)
     nodes = list(range(1, graph.num_nodes + 1))
     best_cost = float("inf")
     best_path = None
+    W = graph.as_array()
 
     # Random selection of start nodes
     start_nodes = min(start_nodes, len(nodes))
     starts = random.sample(nodes, k=start_nodes)
 
-    for start in starts:
-        path = nearest_neighbor(graph, start)
-        cost = tour_cost(graph, path)      # <-- FIXED ORDER
-        if cost < best_cost:
-            best_cost = cost
-            best_path = path
+    with profiling.span("nn_search"):
+        tried = 0
+        for start in starts:
+            if best_path is not None and budget.expired():
+                break
+            path = nearest_neighbor(graph, start, W=W)
+            cost = tour_cost(graph, path)      # <-- FIXED ORDER
+            tried += 1
+            if cost < best_cost:
+                best_cost = cost
+                best_path = path
+                budget.improve(cost)
+        profiling.count("nn_search.starts", tried)
 
     return best_path, best_cost
@@ -2,6 +2,12 @@ from weightedGraph import *
 import heapq
 import math
 
+import numpy as np
+
+# Edge density (fraction of vertex pairs joined by an edge) from which
+# Prim uses the dense key-array version instead of the heap
+DENSE_PRIM_DENSITY = 0.5
+
 def build_tree(T):
     """Builds a dictionary representing the tree from the list of parents."""
     n = len(T) - 1
@@ -32,17 +38,57 @@ def print_tree(T):
         print("No root found")
 
 def get_neighbors(g, node):
-    neighbors = []
-    for i in range(1, g.num_nodes + 1):
-        weight = g.adj_matrix[node][i]
-        if weight != 0:
-            neighbors.append((i, weight))
-    return neighbors
+    # Scan the whole row at once instead of indexing cell by cell
+    row = g.row(node)
+    idx = np.flatnonzero(row[1:]) + 1
+    return list(zip(idx.tolist(), row[idx].tolist()))
+
+def edge_density(W, nodes=None):
+    """Fraction of the vertex pairs in nodes (default 1..n) joined by an edge in W."""
+    if nodes is None:
+        sub = W[1:, 1:]
+    else:
+        idx = np.asarray(nodes, dtype=np.intp)
+        sub = W[np.ix_(idx, idx)]
+    k = sub.shape[0]
+    if k < 2:
+        return 1.0
+    edges = np.count_nonzero(sub) - np.count_nonzero(np.diagonal(sub))
+    return edges / (k * (k - 1))
+
+def Prim(g, nodes=None):
+    """
+    Returns the MST as a parent array T (T[root] == -1).
+    nodes restricts the tree to that subset of vertices; every vertex
+    outside it keeps T[v] == -1.
 
-def Prim(g):
+    Dense input (edge density >= DENSE_PRIM_DENSITY, e.g. the complete
+    graphs from randomGraph, and lazy graphs) goes to the O(n^2)
+    key-array Prim, sparse input to the binary-heap version.
+    """
+    if nodes is not None:
+        nodes = list(nodes)
+    W = g.as_array()
+    if g.is_lazy() or edge_density(W, nodes) >= DENSE_PRIM_DENSITY:
+        return prim_matrix(W, nodes, skip_zeros=True).tolist()
+    return prim_heap(g, nodes)
 
-    root = 1  # assign vertex 1 as the root
-    Visited = [False] * (g.num_nodes + 1) # visited set
+def prim_heap(g, nodes=None):
+    """
+    Binary-heap Prim over get_neighbors; suits sparse graphs.
+    Same arguments and result as Prim.
+    """
+
+    if nodes is None:
+        root = 1  # assign vertex 1 as the root
+        Visited = [False] * (g.num_nodes + 1) # visited set
+    else:
+        nodes = list(nodes)
+        root = nodes[0]
+        # vertices outside the subset count as already visited
+        Visited = [True] * (g.num_nodes + 1)
+        for v in nodes:
+            Visited[v] = False
     T = [-1] * (g.num_nodes + 1) # tree
     pq = []  # Priority queue to store vertices that are being processed
     c = [math.inf] * (g.num_nodes + 1) # vertex cost
@@ -64,6 +110,63 @@ def Prim(g):
         
     return T
 
+def prim_matrix(W, nodes=None, pi=None, skip_zeros=False):
+    """
+    Dense O(n^2) Prim over a padded (n+1) x (n+1) NumPy weight array.
+
+    Every pair of distinct vertices is treated as an edge (complete graph)
+    unless skip_zeros is set, in which case a zero weight means "no edge"
+    as everywhere else in the graph code. A key array holds each vertex's
+    cheapest edge into the tree and the next vertex is picked with one
+    vectorized argmin per step. Vertices the root cannot reach keep
+    T[v] == -1.
+
+    nodes: vertices to span (default 1..n), the first one is the root
+    pi:    optional vertex penalties, edge (u, v) then costs W[u][v] + pi[u] + pi[v]
+
+    Returns the parent array T as a NumPy int array (T[root] == -1).
+    """
+    n = W.shape[0] - 1
+    T = np.full(n + 1, -1, dtype=np.int64)
+    nodes = np.arange(1, n + 1) if nodes is None else np.asarray(list(nodes), dtype=np.intp)
+    k = len(nodes)
+    if k == 0:
+        return T
+    penalty = None if pi is None else np.asarray(pi, dtype=np.float64)[nodes]
+
+    key = np.full(k, math.inf)
+    parent = np.full(k, -1, dtype=np.int64)
+    in_tree = np.zeros(k, dtype=bool)
+
+    u = 0  # position of the root in `nodes`
+    for _ in range(k - 1):
+        in_tree[u] = True
+        row = W[nodes[u], nodes]
+        if skip_zeros:
+            row = np.where(row == 0, math.inf, row)
+        if penalty is not None:
+            row = row + (penalty + penalty[u])
+
+        better = row < key
+        better &= ~in_tree
+        np.copyto(key, row, where=better)
+        parent[better] = u
+
+        u = int(np.argmin(np.where(in_tree, math.inf, key)))
+        if key[u] == math.inf:
+            break  # the rest is not connected to the tree
+        T[nodes[u]] = nodes[parent[u]]
+
+    return T
+
+def mst_weight(g, T):
+    """Total weight of the tree given as a parent array."""
+    total = 0.0
+    for v in range(1, len(T)):
+        if T[v] != -1:
+            total += g.weight(T[v], v)
+    return total
+
 """
 # test
 test_graph = WeightedGraph(5)
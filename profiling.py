@@ -0,0 +1,146 @@
+"""
+Per-phase timing and counters for the solvers.
+
+Solvers wrap their phases in `with profiling.span("name"):` and report
+work done with `profiling.count("name", k)`. Nothing is recorded until
+enable() is called: span() then hands out one shared no-op context and
+count() returns right away, so the hooks can stay in the code for good.
+Hot loops count into a local variable and call count() once at the end.
+
+    profiler = profiling.enable(memory=True)
+    christofides(g)
+    profiling.disable()
+    profiler.write_json("profile.json")
+
+Spans nest: a span opened inside another is recorded as its child, and
+repeated spans with the same name under the same parent are merged
+(time and calls add up). With memory=True every span also records the
+peak traced memory (tracemalloc) while it was open.
+"""
+
+from contextlib import nullcontext
+import json
+import time
+import tracemalloc
+
+# Shared context returned by span() while profiling is off
+_NO_SPAN = nullcontext()
+
+# Profiler that span() / count() report to, None when disabled
+_active = None
+
+
+class Profiler:
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.root = {"children": {}}
+        self.counters = {}
+        self.owns_tracing = False
+        # Open spans: [node, start time, peak bytes seen while open]
+        self.stack = [[self.root, time.perf_counter(), 0]]
+
+    def enter(self, name):
+        parent = self.stack[-1]
+        node = parent[0]["children"].get(name)
+        if node is None:
+            node = {"time": 0.0, "calls": 0, "children": {}}
+            parent[0]["children"][name] = node
+        if self.memory:
+            # Fold the parent's peak so far in before restarting the peak
+            parent[2] = max(parent[2], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self.stack.append([node, time.perf_counter(), 0])
+
+    def exit(self):
+        node, started, peak = self.stack.pop()
+        node["time"] += time.perf_counter() - started
+        node["calls"] += 1
+        if self.memory:
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            node["peak_bytes"] = max(node.get("peak_bytes", 0), peak)
+            self.stack[-1][2] = max(self.stack[-1][2], peak)
+            tracemalloc.reset_peak()
+
+    def span(self, name):
+        return _Span(self, name)
+
+    def count(self, name, k=1):
+        self.counters[name] = self.counters.get(name, 0) + k
+
+    def to_dict(self):
+        """Spans as nested {name: {"time", "calls", ["peak_bytes"], "children"}} plus the counters."""
+        return {"spans": self.root["children"], "counters": dict(self.counters)}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def report(self):
+        """Indented text version of the spans and counters."""
+        lines = []
+
+        def walk(children, depth):
+            for name, node in children.items():
+                line = f"{'  ' * depth}{name:{max(1, 30 - 2 * depth)}} {node['time']:10.6f}s {node['calls']:7}x"
+                if "peak_bytes" in node:
+                    line += f" {node['peak_bytes'] / 2**20:9.2f} MiB peak"
+                lines.append(line)
+                walk(node["children"], depth + 1)
+
+        walk(self.root["children"], 0)
+        for name, value in self.counters.items():
+            lines.append(f"{name:30} {value}")
+        return "\n".join(lines)
+
+
+class _Span:
+    __slots__ = ("profiler", "name")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.enter(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.exit()
+        return False
+
+
+# ---------------------------
+# Module-level hooks
+# ---------------------------
+def enable(memory=False):
+    """Start recording into a new Profiler and return it."""
+    global _active
+    _active = Profiler(memory)
+    # Only stop tracemalloc later if it was started here
+    _active.owns_tracing = memory and not tracemalloc.is_tracing()
+    if _active.owns_tracing:
+        tracemalloc.start()
+    return _active
+
+def disable():
+    """Stop recording; returns the Profiler that was active (or None)."""
+    global _active
+    profiler, _active = _active, None
+    if profiler is not None and profiler.owns_tracing:
+        tracemalloc.stop()
+    return profiler
+
+def enabled():
+    return _active is not None
+
+def span(name):
+    if _active is None:
+        return _NO_SPAN
+    return _Span(_active, name)
+
+def count(name, k=1):
+    if _active is not None:
+        _active.count(name, k)
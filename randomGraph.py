@@ -1,14 +1,25 @@
 # Must include the weightedGraph file
 from weightedGraph import WeightedGraph
+from lazyGraph import LazyWeightedGraph
+from timeCost import edge_penalties, travel_times
 
-def randomWeightedComplete(numNodes):
+import numpy as np
+
+# Rows generated per vectorized batch in randomWeightedCompleteBulk.
+# Fixed so that a seed always maps to the same matrix.
+BULK_BLOCK_ROWS = 512
+
+def randomWeightedComplete(numNodes, dtype=None, seed=1):
     """
     Generates a random weighted complete graph with vertices labeled 1 to numNodes
 
     - Uses the time-cost model defined in the weightedGraph class (edge_time_cost(***))
+    - dtype (np.float32 / np.float64) stores the matrix as a NumPy array
+    - seed is passed on to WeightedGraph, which reseeds the global random module
+      for the coordinates and keys the per-edge penalties
 
     """
-    graph = WeightedGraph(numNodes)
+    graph = WeightedGraph(numNodes, dtype=dtype, seed=seed)
 
     for index in range(1, numNodes + 1):
         for inner_index in range(index + 1, numNodes + 1):
@@ -17,8 +28,60 @@ def randomWeightedComplete(numNodes):
 
     return graph
 
+def randomWeightedCompleteBulk(numNodes, seed=1, dtype=np.float64):
+    """
+    Vectorized generator for large random weighted complete graphs.
+
+    - Same time-cost model as edgeTimeCost (distance / 10 + traffic + lights),
+      computed in row blocks; coordinates come from a numpy.random.Generator
+      seeded with `seed`, penalties from timeCost.edge_penalties(seed, ...)
+    - Never touches the global random module; a given seed always produces
+      the same matrix
+    - Returns an array-backed WeightedGraph whose seed is `seed`, so its
+      edgeTimeCost gives the same weights as the matrix
+
+    """
+    rng = np.random.default_rng(seed)
+
+    xy = rng.integers(0, 101, size=(numNodes, 2))
+    coordinates = {node: (x, y) for node, (x, y) in enumerate(xy.tolist(), start=1)}
+    graph = WeightedGraph(numNodes, dtype=dtype, seed=seed, coordinates=coordinates)
+
+    x = xy[:, 0].astype(np.float64)
+    y = xy[:, 1].astype(np.float64)
+    labels = np.arange(1, numNodes + 1)
+
+    # View without the padding row/column: weights[i, j] is edge (i+1, j+1)
+    weights = graph.adj_matrix[1:, 1:]
+
+    for start in range(0, numNodes, BULK_BLOCK_ROWS):
+        stop = min(start + BULK_BLOCK_ROWS, numNodes)
+
+        # Only columns >= start are new; the rest are mirrored below
+        dx = x[start:stop, None] - x[None, start:]
+        dy = y[start:stop, None] - y[None, start:]
+        penalty = edge_penalties(seed or 0, labels[start:stop, None], labels[None, start:])
+        block = travel_times(dx, dy, penalty)
+
+        # Keep the upper triangle, then mirror it into the lower one
+        weights[start:stop, start:] = np.triu(block, 1)
+        weights[start:stop, :start] = weights[:start, start:stop].T
+        square = weights[start:stop, start:stop]
+        square[...] = square + square.T
+
+    return graph
+
+def randomWeightedLazy(numNodes, seed=1):
+    """
+    Coordinate-only graph with the same weights as randomWeightedCompleteBulk
+    with the same seed, computed on demand (O(n) memory).
+
+    """
+    rng = np.random.default_rng(seed)
+    xy = rng.integers(0, 101, size=(numNodes, 2))
+    return LazyWeightedGraph(xy, seed=seed or 0)
+
 # Small test cases
 #g = randomWeightedComplete(5)
 #g.print_graph()
 #print("Edges:", g.num_edges())
-
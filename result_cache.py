@@ -0,0 +1,168 @@
+"""
+Content-addressed, on-disk cache of solver results.
+
+An instance is identified by fingerprint(graph), a sha256 of its padded
+weight matrix (dtype included). A lazy graph is identified by its
+coordinates and seed instead, since they determine every weight. A
+result is stored under sha256(fingerprint, algorithm, params):
+
+    <directory>/results/<key>.json   {"algorithm", "params", "nodes",
+                                      "cost", "tour", "optimal", "time"}
+    <directory>/optima/<fingerprint>.json   best proven-optimal tour
+
+cached_solve looks the key up first and skips the solve on a hit. Once
+any exact run has stored an optimum for the instance, later exact runs
+return it whatever their parameters, and heuristic runs that have to
+solve get it as their incumbent, so they return nothing worse. A result
+with "timed_out" set is returned but not stored, so a later call with a
+budget that suffices solves again. Writes are atomic (temp file + rename). When the directory grows past max_bytes, the
+least recently used files, results and optima alike, are deleted (a
+hit refreshes the file's mtime); the entry just written is kept.
+
+    cache = ResultCache(".tsp_cache")
+    result, source = cached_solve(cache, g, "held_karp", {"timeout": 60}, run)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+# Default cache location and size bound
+CACHE_DIR = ".tsp_cache"
+CACHE_MAX_BYTES = 256 * 2**20
+
+# Algorithms whose results are optimal when they finish
+EXACT_ALGORITHMS = ("held_karp", "branch_and_bound")
+
+# Matrix rows hashed per block
+HASH_BLOCK_ROWS = 1024
+
+
+def fingerprint(graph):
+    """sha256 hex digest identifying the instance's weights."""
+    h = hashlib.sha256()
+    n = graph.num_nodes
+    if graph.is_lazy():
+        h.update(f"lazy:{n}:{graph.seed}".encode())
+        h.update(np.ascontiguousarray(graph.x).tobytes())
+        h.update(np.ascontiguousarray(graph.y).tobytes())
+        return h.hexdigest()
+
+    W = graph.as_array()
+    h.update(f"matrix:{n}:{W.dtype.str}".encode())
+    for start in range(0, n + 1, HASH_BLOCK_ROWS):
+        h.update(np.ascontiguousarray(W[start:start + HASH_BLOCK_ROWS]).tobytes())
+    return h.hexdigest()
+
+def result_key(fp, algorithm, params):
+    text = json.dumps([fp, algorithm, params], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        for sub in ("results", "optima"):
+            os.makedirs(os.path.join(directory, sub), exist_ok=True)
+
+    def _path(self, kind, name):
+        return os.path.join(self.directory, kind, name + ".json")
+
+    def _read(self, path):
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError):
+            # Missing, or evicted / replaced by another process meanwhile
+            return None
+        return entry
+
+    def _write(self, path, entry):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+    def get(self, fp, algorithm, params):
+        """Stored result dict, or None."""
+        return self._read(self._path("results", result_key(fp, algorithm, params)))
+
+    def put(self, fp, algorithm, params, result):
+        """
+        Store result ({"cost", "tour", "optimal", ...}); an optimal one also
+        becomes the instance's optimum. Evicts old entries when over max_bytes.
+        """
+        entry = dict(result, algorithm=algorithm, params=params)
+        written = [self._path("results", result_key(fp, algorithm, params))]
+        self._write(written[0], entry)
+        if result.get("optimal"):
+            known = self.optimum(fp)
+            if known is None or result["cost"] < known["cost"]:
+                written.append(self._path("optima", fp))
+                self._write(written[1], entry)
+        self.evict(keep=written)
+
+    def optimum(self, fp):
+        """Proven-optimal {"cost", "tour", ...} for the instance, or None."""
+        return self._read(self._path("optima", fp))
+
+    def evict(self, keep=()):
+        """
+        Delete least recently used results and optima until the cache fits
+        in max_bytes. Paths in keep are never deleted.
+        """
+        keep = {os.path.abspath(path) for path in keep}
+        files = []
+        total = 0
+        for sub in ("results", "optima"):
+            with os.scandir(os.path.join(self.directory, sub)) as it:
+                for item in it:
+                    stat = item.stat()
+                    total += stat.st_size
+                    if os.path.abspath(item.path) not in keep:
+                        files.append((stat.st_mtime, stat.st_size, item.path))
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # another process evicted it first
+            total -= size
+
+
+def cached_solve(cache, graph, algorithm, params, run, fp=None):
+    """
+    Result of run(incumbent) for (graph, algorithm, params), through cache.
+
+    run(incumbent) solves and returns {"cost", "tour", "optimal", ...};
+    incumbent is a known optimal tour (a list) or None. Returns
+    (result, source) with source "hit" (stored result), "optimum" (known
+    optimum returned to an exact algorithm) or "solved". A timed-out
+    result is not stored. fp saves hashing
+    the matrix again when the caller already has fingerprint(graph).
+    """
+    if fp is None:
+        fp = fingerprint(graph)
+    stored = cache.get(fp, algorithm, params)
+    if stored is not None:
+        return stored, "hit"
+
+    known = cache.optimum(fp)
+    if known is not None and algorithm in EXACT_ALGORITHMS:
+        return dict(known, algorithm=algorithm, params=params), "optimum"
+
+    started = time.perf_counter()
+    result = run(None if known is None else known["tour"])
+    result.setdefault("time", time.perf_counter() - started)
+    result.setdefault("nodes", graph.num_nodes)
+    if not result.get("timed_out"):
+        cache.put(fp, algorithm, params, result)
+    return result, "solved"
@@ -0,0 +1,290 @@
+"""
+Long-running solver daemon.
+
+An asyncio server on a Unix socket (or a localhost TCP port) that takes
+newline-delimited JSON requests and answers each with one JSON line:
+
+    {"id": 1, "graph": {"nodes": 500, "seed": 3}, "algorithm": "christofides"}
+    {"id": 2, "graph": {"path": "berlin52.tsp"}, "timeout": 2}
+    {"op": "stats"}   {"op": "ping"}
+
+"graph" takes the same instance specs as batch.py jobs, and "algorithm"
+defaults to batch.choose_algorithm. Besides the batch algorithms there
+is "local_search" (NN + 2-opt + Or-opt / 3-opt on cached candidate
+lists). Answers carry "id", so requests on one connection may be
+answered out of order.
+
+Solves run on `workers` single-process pools. Each instance key is
+always routed to the same process, and that process keeps an LRU cache
+of graphs with their Prim MST, candidate lists and latest results. A
+repeated query skips Python startup, imports and loading, and reuses the
+MST and candidates; the same (algorithm, timeout, seed) again is
+answered from memory without solving ("results": "memory"), unless it
+timed out. Only the request and the result cross process boundaries.
+With --cache, results also go through the on-disk result_cache, so they
+survive restarts and evictions ("results": "hit").
+
+    python3 server.py --socket /tmp/tsp.sock --workers 4
+    python3 server.py --port 8453
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import signal
+import socket
+import time
+
+from batch import JOB_TIMEOUT, NN_STARTS, better_of, choose_algorithm, load_instance, solve
+from budget import Budget
+from christofides_v1 import christofides_with_stats
+from local_search import CANDIDATES, candidate_lists, local_search
+from nn_2opt import nn_search, tour_cost
+from prims import Prim
+from result_cache import ResultCache, cached_solve, fingerprint
+from tour import Tour
+
+# Graphs kept per worker process
+GRAPH_CACHE_SIZE = 16
+
+# Results kept in memory per cached graph, by (algorithm, timeout, seed)
+RESULTS_PER_GRAPH = 8
+
+# Default TCP port when no socket path is given
+DEFAULT_PORT = 8453
+
+# ---------------------------
+# Worker side
+# ---------------------------
+# Per-process cache: key -> {"graph", "mst", "candidates", "results"}
+_cache = OrderedDict()
+_cache_size = GRAPH_CACHE_SIZE
+# On-disk result cache (result_cache.ResultCache), None when disabled
+_results = None
+
+def _init_worker(cache_size, cache_dir=None):
+    global _cache_size, _results
+    _cache_size = cache_size
+    if cache_dir is not None:
+        _results = ResultCache(cache_dir)
+
+def instance_key(spec):
+    """Cache key of an instance spec; file specs include size and mtime."""
+    if "path" in spec:
+        info = os.stat(spec["path"])
+        spec = dict(spec, path=os.path.abspath(spec["path"]), mtime=info.st_mtime_ns, size=info.st_size)
+    text = json.dumps(spec, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def cached_instance(key, spec):
+    """(entry, hit) with entry = {"graph", "mst", "candidates", "results"} from the LRU cache."""
+    entry = _cache.get(key)
+    if entry is not None:
+        _cache.move_to_end(key)
+        return entry, True
+    entry = {"graph": load_instance(spec), "mst": None, "candidates": None, "results": OrderedDict()}
+    _cache[key] = entry
+    while len(_cache) > _cache_size:
+        _cache.popitem(last=False)
+    return entry, False
+
+def solve_cached(entry, algorithm, timeout, seed=1, incumbent=None):
+    """Like batch.solve, but reuses the entry's MST and candidate lists."""
+    graph = entry["graph"]
+    if algorithm == "christofides":
+        if entry["mst"] is None:
+            entry["mst"] = Prim(graph)
+        budget = Budget(timeout, solver=algorithm)
+        tour, cost, _ = christofides_with_stats(graph, budget=budget, mst=entry["mst"])
+        return better_of(graph, tour, cost, incumbent) + (budget.expired(),)
+    if algorithm == "local_search":
+        if entry["candidates"] is None:
+            entry["candidates"] = candidate_lists(graph, CANDIDATES)
+        random.seed(seed)
+        budget = Budget(timeout, solver=algorithm)
+        path, cost = nn_search(graph, start_nodes=min(NN_STARTS, graph.num_nodes), budget=budget)
+        if incumbent is not None and tour_cost(graph, incumbent) < cost:
+            path = Tour(incumbent, graph.num_nodes)
+        tour, _ = local_search(graph, path, candidates=entry["candidates"], budget=budget)
+        return better_of(graph, tour, tour_cost(graph, tour), incumbent) + (budget.expired(),)
+    return solve(graph, algorithm, timeout, seed, incumbent)
+
+def handle_solve(request, key):
+    """Solve one request in a worker. Never raises; errors come back in "error"."""
+    started = time.perf_counter()
+    result = {"id": request.get("id")}
+    try:
+        entry, hit = cached_instance(key, request["graph"])
+        graph = entry["graph"]
+        algorithm = request.get("algorithm") or choose_algorithm(graph.num_nodes)
+        timeout = request.get("timeout", JOB_TIMEOUT)
+        seed = request.get("seed", 1)
+
+        def run(incumbent):
+            tour, cost, optimal, timed_out = solve_cached(entry, algorithm, timeout, seed, incumbent)
+            return {"cost": float(cost), "tour": [int(v) for v in tour], "optimal": optimal,
+                    "timed_out": timed_out}
+
+        memo, memo_key = entry["results"], (algorithm, timeout, seed)
+        stored = memo.get(memo_key)
+        if stored is not None:
+            memo.move_to_end(memo_key)
+            result["results"] = "memory"
+        elif _results is None:
+            stored = run(None)
+        else:
+            if "fingerprint" not in entry:
+                entry["fingerprint"] = fingerprint(graph)
+            params = {"timeout": timeout, "seed": seed}
+            stored, result["results"] = cached_solve(_results, graph, algorithm, params, run,
+                                                     entry["fingerprint"])
+        if not stored.get("timed_out", False):
+            memo[memo_key] = stored
+            while len(memo) > RESULTS_PER_GRAPH:
+                memo.popitem(last=False)
+
+        tour, cost, optimal = stored["tour"], stored["cost"], stored["optimal"]
+        timed_out = stored.get("timed_out", False)
+        result.update({
+            "nodes": graph.num_nodes,
+            "algorithm": algorithm,
+            "cost": float(cost),
+            "optimal": optimal,
+            "timed_out": timed_out,
+            "cache": "hit" if hit else "miss",
+            "time": time.perf_counter() - started,
+        })
+        if request.get("tours", True):
+            result["tour"] = [int(v) for v in tour]
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["time"] = time.perf_counter() - started
+    return result
+
+# ---------------------------
+# Server side
+# ---------------------------
+class SolverServer:
+    def __init__(self, workers=None, cache_size=GRAPH_CACHE_SIZE, cache_dir=None):
+        self.workers = workers or os.cpu_count() or 1
+        # One process per pool, so a key always meets its own cache
+        self.pools = [ProcessPoolExecutor(max_workers=1, initializer=_init_worker,
+                                          initargs=(cache_size, cache_dir))
+                      for _ in range(self.workers)]
+        self.stats = {"requests": 0, "solved": 0, "errors": 0, "cache_hits": 0}
+
+    async def answer(self, request):
+        op = request.get("op", "solve")
+        if op == "ping":
+            return {"id": request.get("id"), "ok": True}
+        if op == "stats":
+            return dict(self.stats, id=request.get("id"), workers=self.workers)
+        if op != "solve":
+            return {"id": request.get("id"), "error": f"Unknown op: {op}"}
+
+        self.stats["requests"] += 1
+        try:
+            key = instance_key(request["graph"])
+        except (KeyError, OSError, TypeError) as e:
+            self.stats["errors"] += 1
+            return {"id": request.get("id"), "error": f"{type(e).__name__}: {e}"}
+
+        pool = self.pools[int(key[:8], 16) % self.workers]
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(pool, handle_solve, request, key)
+        if "error" in result:
+            self.stats["errors"] += 1
+        else:
+            self.stats["solved"] += 1
+            self.stats["cache_hits"] += result["cache"] == "hit"
+        return result
+
+    async def handle_connection(self, reader, writer):
+        tasks = set()
+
+        async def respond(request):
+            writer.write((json.dumps(await self.answer(request)) + "\n").encode())
+            await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as e:
+                    writer.write((json.dumps({"error": f"Bad JSON: {e}"}) + "\n").encode())
+                    continue
+                task = asyncio.create_task(respond(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path=None, host="127.0.0.1", port=DEFAULT_PORT, ready=None):
+        """Serve until cancelled. ready() is called once the socket is listening."""
+        if socket_path:
+            server = await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        if ready is not None:
+            ready()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+            if socket_path and os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+    def close(self):
+        for pool in self.pools:
+            pool.shutdown(cancel_futures=True)
+
+# ---------------------------
+# Client
+# ---------------------------
+def request(payload, socket_path=None, host="127.0.0.1", port=DEFAULT_PORT):
+    """Send one request to a running server and return its answer (blocking)."""
+    if socket_path:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(socket_path)
+    else:
+        conn = socket.create_connection((host, port))
+    with conn, conn.makefile("rw") as stream:
+        stream.write(json.dumps(payload) + "\n")
+        stream.flush()
+        return json.loads(stream.readline())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve TSP solves over a Unix socket or localhost.")
+    parser.add_argument("--socket", help="Unix socket path (default: TCP on localhost)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache-size", type=int, default=GRAPH_CACHE_SIZE,
+                        help="graphs cached per worker")
+    parser.add_argument("--cache", help="on-disk result cache directory (see result_cache.py)")
+    args = parser.parse_args()
+
+    server = SolverServer(args.workers, args.cache_size, args.cache)
+    where = args.socket or f"127.0.0.1:{args.port}"
+
+    async def main():
+        # SIGTERM stops the server the same way Ctrl-C does
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        await server.serve(args.socket, port=args.port,
+                           ready=lambda: print(f"Listening on {where} with {server.workers} workers"))
+
+    try:
+        asyncio.run(main())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
@@ -0,0 +1,44 @@
+"""
+NumPy arrays backed by named shared memory.
+
+A process creates a block with create_shared and hands the small `spec`
+tuple (name, shape, dtype) to workers, which map the same memory with
+attach_shared. Nothing but the spec is pickled.
+"""
+from multiprocessing import shared_memory
+
+import numpy as np
+
+def create_shared(shape, dtype, fill=None):
+    """
+    Allocate a shared block and return (shm, array, spec).
+    The creator is responsible for shm.close() and shm.unlink().
+    """
+    dtype = np.dtype(dtype)
+    nbytes = max(1, int(np.prod(shape)) * dtype.itemsize)
+    shm = shared_memory.SharedMemory(create=True, size=nbytes)
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    if fill is not None:
+        array[...] = fill
+    return shm, array, (shm.name, tuple(shape), dtype.str)
+
+def share_array(source):
+    """Copy an existing array into a new shared block; returns (shm, array, spec)."""
+    source = np.asarray(source)
+    shm, array, spec = create_shared(source.shape, source.dtype)
+    array[...] = source
+    return shm, array, spec
+
+def attach_shared(spec):
+    """Map the block described by spec; returns (shm, array). Call shm.close() when done."""
+    name, shape, dtype = spec
+    # Pool workers share their parent's resource tracker, so attaching here
+    # does not make the block outlive (or die with) this process
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+def release_shared(*blocks):
+    """Close and unlink blocks created by this process."""
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
@@ -0,0 +1,80 @@
+"""
+Deterministic travel-time model shared by every graph generator.
+
+An edge's traffic and light penalties are a pure function of
+(seed, min(u, v), max(u, v)): the pair is packed into one 64-bit counter
+and hashed with the splitmix64 finalizer. Any weight can therefore be
+computed on its own (lazily, in a pool worker, in any order) and still
+equal the weight stored by randomWeightedComplete / the bulk generator.
+
+    weight = round(round(distance, 2) / 10 + 2 * traffic + 1.5 * lights, 2)
+
+with traffic in 0..2 and lights in 0..3, as in WeightedGraph.edgeTimeCost.
+Rounding always goes through NumPy (travel_times) so the scalar and the
+vectorized paths agree to the last bit.
+"""
+
+import numpy as np
+
+MASK64 = (1 << 64) - 1
+
+# splitmix64 constants
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+MIX_MUL1 = 0xBF58476D1CE4E5B9
+MIX_MUL2 = 0x94D049BB133111EB
+
+# Penalty units per traffic level / per light
+TRAFFIC_PENALTY = 2.0
+LIGHT_PENALTY = 1.5
+
+
+def mix64(z):
+    """splitmix64 finalizer on a Python int (0 <= z < 2**64)."""
+    z = (z + GOLDEN_GAMMA) & MASK64
+    z = ((z ^ (z >> 30)) * MIX_MUL1) & MASK64
+    z = ((z ^ (z >> 27)) * MIX_MUL2) & MASK64
+    return z ^ (z >> 31)
+
+def _mix64_array(z):
+    # Same as mix64 on uint64 arrays; the products wrap modulo 2**64
+    with np.errstate(over="ignore"):
+        z = z + np.uint64(GOLDEN_GAMMA)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(MIX_MUL1)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(MIX_MUL2)
+    return z ^ (z >> np.uint64(31))
+
+# ---------------------------
+# Penalties
+# ---------------------------
+def edge_penalty(seed, u, v):
+    """Traffic + light penalty of edge (u, v); symmetric in u and v."""
+    lo, hi = (int(u), int(v)) if u < v else (int(v), int(u))
+    h = mix64(mix64(seed & MASK64) ^ ((lo << 32) | hi))
+    return (h % 3) * TRAFFIC_PENALTY + ((h >> 32) % 4) * LIGHT_PENALTY
+
+def edge_penalties(seed, us, vs):
+    """edge_penalty for integer arrays us, vs (broadcast like NumPy), as float64."""
+    us = np.asarray(us, dtype=np.uint64)
+    vs = np.asarray(vs, dtype=np.uint64)
+    key = (np.minimum(us, vs) << np.uint64(32)) | np.maximum(us, vs)
+    h = _mix64_array(np.uint64(mix64(seed & MASK64)) ^ key)
+    traffic = (h % np.uint64(3)).astype(np.float64)
+    lights = ((h >> np.uint64(32)) % np.uint64(4)).astype(np.float64)
+    return traffic * TRAFFIC_PENALTY + lights * LIGHT_PENALTY
+
+# ---------------------------
+# Travel time
+# ---------------------------
+def travel_times(dx, dy, penalty):
+    """
+    Rounded travel times from coordinate differences and penalties
+    (arrays or scalars). Every generator goes through this function.
+    """
+    dx = np.asarray(dx, dtype=np.float64)
+    dy = np.asarray(dy, dtype=np.float64)
+    distance = np.round(np.sqrt(dx * dx + dy * dy), 2)
+    return np.round(distance / 10.0 + penalty, 2)
+
+def travel_time(dx, dy, penalty):
+    """travel_times for one edge, as a Python float."""
+    return float(travel_times(dx, dy, penalty))
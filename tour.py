@@ -0,0 +1,175 @@
+from array import array
+
+import numpy as np
+
+class Tour:
+    """
+    A Hamiltonian cycle over vertex labels 1..n.
+
+    The visiting order lives in a compact array('i') together with its
+    inverse (pos[v] = index of v in the order), so next/prev/between are
+    O(1) and a 2-opt reversal is done in place on whichever side of the
+    cycle is shorter. The first vertex is not repeated at the end.
+
+    Tour also behaves like the plain lists used before it: len(), iteration,
+    indexing (slices give lists), index(), `tour + [x]` and comparison with
+    lists all work, and np.asarray(tour) gives the order as an int array.
+    """
+
+    def __init__(self, vertices=(), num_nodes=None):
+        self.order = array('i', vertices)
+        if num_nodes is None:
+            num_nodes = max(self.order) if self.order else 0
+        self.pos = array('i', [-1]) * (num_nodes + 1)
+        for i, v in enumerate(self.order):
+            self.pos[v] = i
+
+# ----------- Sequence behaviour --------------
+
+    def __len__(self):
+        return len(self.order)
+
+    def __iter__(self):
+        return iter(self.order)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.order[i].tolist()
+        return self.order[i]
+
+    def __contains__(self, v):
+        return 0 <= v < len(self.pos) and self.pos[v] != -1
+
+    def __eq__(self, other):
+        if isinstance(other, Tour):
+            return self.order == other.order
+        if isinstance(other, (list, tuple)):
+            return self.order.tolist() == list(other)
+        return NotImplemented
+
+    def __add__(self, other):
+        return self.order.tolist() + list(other)
+
+    def __radd__(self, other):
+        return list(other) + self.order.tolist()
+
+    def __repr__(self):
+        return f"Tour({self.order.tolist()})"
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array(self.order, dtype=np.int64 if dtype is None else dtype)
+
+    def index(self, v):
+        return self.pos[v]
+
+    def copy(self):
+        return Tour(self.order, len(self.pos) - 1)
+
+    def tolist(self):
+        return self.order.tolist()
+
+    def closed(self):
+        """The cycle as a list that returns to its first vertex."""
+        return self.order.tolist() + self.order[:1].tolist()
+
+# ----------- O(1) queries --------------
+
+    def next(self, v):
+        i = self.pos[v] + 1
+        return self.order[i if i < len(self.order) else 0]
+
+    def prev(self, v):
+        return self.order[self.pos[v] - 1]
+
+    def between(self, a, b, c):
+        """True if walking forward from a reaches b no later than c."""
+        pa, pb, pc = self.pos[a], self.pos[b], self.pos[c]
+        if pa <= pc:
+            return pa <= pb <= pc
+        return pb >= pa or pb <= pc
+
+# ----------- In-place reversal --------------
+
+    def reverse(self, i, j):
+        """
+        Reverse the cyclic segment order[i..j] (walking forward from i to j).
+        If that segment is longer than half the tour, the complementary
+        segment is reversed instead, which gives the same cycle.
+        """
+        order, pos = self.order, self.pos
+        n = len(order)
+        length = (j - i) % n + 1
+        if 2 * length > n:
+            i, j = (j + 1) % n, (i - 1) % n
+            length = n - length
+
+        for _ in range(length // 2):
+            a, b = order[i], order[j]
+            order[i], order[j] = b, a
+            pos[a], pos[b] = j, i
+            i = i + 1 if i + 1 < n else 0
+            j = j - 1 if j > 0 else n - 1
+
+    def reverse_path(self, outer, u, v):
+        """Reverse the path u..v whose end u is attached to `outer` outside the path."""
+        if self.prev(u) == outer:
+            self.reverse(self.pos[u], self.pos[v])
+        elif self.next(u) == outer:
+            self.reverse(self.pos[v], self.pos[u])
+
+    def move_segment(self, s_first, s_last, forward, t_first, t_last):
+        """
+        Cut the path s_first..s_last out of the cycle and put it between the
+        adjacent vertices t_first and t_last, so that t_first ends up next
+        to s_first and t_last next to s_last. forward says whether the path
+        runs from s_first to s_last in forward order (positions alone cannot
+        tell when the segment and the rest of the cycle have equal length).
+        Done with at most three reversals, each flipping the shorter side.
+        """
+        pos = self.pos
+
+        # Name the segment ends A..B in forward order
+        if forward:
+            A, B, tA, tB = s_first, s_last, t_first, t_last
+        else:
+            A, B, tA, tB = s_last, s_first, t_last, t_first
+        p = self.prev(A)
+        nx = self.next(B)
+
+        # Forward from nx we meet x, then y:   p A..B nx..x y
+        x, y = (tA, tB) if self.next(tA) == tB else (tB, tA)
+
+        # p A..B nx..x y  ->  p x..nx B..A y  ->  p nx..x B..A y
+        self.reverse(pos[A], pos[x])
+        self.reverse_path(p, x, nx)
+
+        # x is now next to B; flip the segment if A should be next to x instead
+        if x == tA:
+            self.reverse_path(x, B, A)
+
+# ----------- Insertion and removal --------------
+
+    def insert_after(self, a, v):
+        """Put v (not yet in the tour) between a and its successor. O(n)."""
+        if v >= len(self.pos):
+            self.pos.extend([-1] * (v + 1 - len(self.pos)))
+        i = self.pos[a] + 1
+        self.order.insert(i, v)
+        order, pos = self.order, self.pos
+        for j in range(i, len(order)):
+            pos[order[j]] = j
+
+    def remove(self, v):
+        """Splice v out of the tour, joining its two neighbors. O(n)."""
+        i = self.pos[v]
+        del self.order[i]
+        self.pos[v] = -1
+        order, pos = self.order, self.pos
+        for j in range(i, len(order)):
+            pos[order[j]] = j
+
+def as_tour(tour, num_nodes=None):
+    """Return tour itself if it already is a Tour, else a Tour built from it."""
+    if isinstance(tour, Tour):
+        return tour
+    return Tour(tour, num_nodes)
@@ -0,0 +1,222 @@
+"""
+Incremental repair of a solved tour when a stop is added or dropped.
+
+Instead of rebuilding the graph and solving again, TourRepair keeps the
+tour, its candidate lists and a LocalSearch engine alive between updates:
+
+    insert(coordinates=(x, y))   add the vertex to the graph (add_node /
+                                 add_edge), put it at the cheapest position
+                                 and repair around it
+    remove(v)                    splice v out, drop its edges (remove_edge)
+                                 and repair around the gap
+
+Each update costs O(k * n): one pass over the tour for the cheapest
+insertion, one over the candidate lists to add or replace v, and a
+2-opt / Or-opt descent whose queues start with only the vertices next to
+the change and the ones whose candidate lists changed.
+
+    repair = TourRepair(g, tour)
+    v = repair.insert(coordinates=(40, 55))
+    repair.remove(17)
+    repair.tour, repair.cost()
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from local_search import CANDIDATES, LocalSearch, local_search
+from nn_2opt import nearest_neighbor, tour_cost
+from randomGraph import randomWeightedCompleteBulk
+from weightedGraph import WeightedGraph
+
+# Neighborhoods used to repair the tour after an update
+REPAIR_CHAIN = ("2opt", "oropt")
+
+
+class TourRepair:
+    """
+    A tour over graph kept (near) locally optimal under insertions and
+    removals. graph is a WeightedGraph (list or array mode). A lazy graph
+    works too, but its weights are computed, so only vertices it already
+    has can be inserted and removed vertices keep their edges.
+    candidates (k nearest neighbors per vertex) are computed when not given.
+    The tour may leave vertices out; they can be inserted later.
+    """
+
+    def __init__(self, graph, tour, candidates=None, k=CANDIDATES, chain=REPAIR_CHAIN):
+        self.graph = graph
+        self.k = k
+        self.chain = tuple(chain)
+        self.search = LocalSearch(graph, tour, candidates, k)
+        self.search.dist = self._dist()
+        self.tour = self.search.tour
+        # Own copies, since updates edit the lists in place. Vertices off
+        # the tour (or dropped ones, whose 0 reads as nearest) must never
+        # be offered as move partners
+        tour = self.tour
+        if len(tour) < graph.num_nodes:
+            self.candidates = [[w for w in c if w in tour] if u in tour else []
+                               for u, c in enumerate(self.search.candidates)]
+        else:
+            self.candidates = [list(c) for c in self.search.candidates]
+        self.search.candidates = self.candidates
+        self.stats = {}
+
+    def _dist(self):
+        # Scalar lookup that sees edits to the graph (as_array copies list mode)
+        if self.graph.is_array():
+            return self.graph.adj_matrix.item
+        return self.graph.weight
+
+    def cost(self):
+        return tour_cost(self.graph, self.tour)
+
+# ----------- Updates --------------
+
+    def insert(self, v=None, coordinates=None, weights=None):
+        """
+        Add a stop and return its label. With v=None a new vertex is added
+        to the graph first (WeightedGraph.add_node with coordinates or
+        weights); otherwise v is an existing vertex not in the tour.
+        """
+        if v is None:
+            if self.graph.is_lazy():
+                raise ValueError("A lazy graph cannot grow; insert one of its existing vertices")
+            v = self.graph.add_node(coordinates, weights)
+            self.search.dist = self._dist()
+        if v in self.tour:
+            raise ValueError(f"Vertex {v} is already in the tour")
+
+        a = self.cheapest_position(v)
+        b = self.tour.next(a)
+        self.tour.insert_after(a, v)
+        changed = self._add_candidate(v)
+        self.repair([a, v, b] + changed)
+        return v
+
+    def remove(self, v, keep_edges=False):
+        """
+        Drop stop v from the tour. Its edges are removed from the graph as
+        well (WeightedGraph.remove_node) unless keep_edges is set, e.g. so
+        that it can be inserted again later. Lazy graphs always keep them.
+        """
+        if v not in self.tour:
+            raise ValueError(f"Vertex {v} is not in the tour")
+        p, nx = self.tour.prev(v), self.tour.next(v)
+        self.tour.remove(v)
+        if not keep_edges and not self.graph.is_lazy():
+            self.graph.remove_node(v)
+        changed = self._drop_candidate(v)
+        if p != v:
+            self.repair([p, nx] + changed)
+
+    def repair(self, active):
+        """Local descent over self.chain starting from the active vertices only."""
+        self.search.run(self.chain, active)
+        self.stats = self.search.stats
+        return self.tour
+
+# ----------- Cheapest insertion --------------
+
+    def cheapest_position(self, v):
+        """Tour vertex a such that putting v between a and its successor costs least."""
+        t = np.asarray(self.tour, dtype=np.intp)
+        nxt = np.roll(t, -1)
+        row = np.asarray(self.graph.row(v), dtype=np.float64)
+        delta = row[t] + row[nxt] - self._edge_weights(t, nxt)
+        return int(t[int(np.argmin(delta))])
+
+    def _edge_weights(self, us, vs):
+        # Weights of the pairs (us[i], vs[i]) as a float64 array
+        if self.graph.is_array():
+            return np.asarray(self.graph.adj_matrix[us, vs], dtype=np.float64)
+        if self.graph.is_lazy():
+            return np.asarray(self.graph.weights(us, vs), dtype=np.float64)
+        weight = self.graph.weight
+        return np.array([weight(u, w) for u, w in zip(us.tolist(), vs.tolist())], dtype=np.float64)
+
+# ----------- Candidate lists --------------
+
+    def _nearest(self, u):
+        # The k nearest tour vertices of u, nearest first
+        row = np.array(self.graph.row(u), dtype=np.float64)
+        outside = np.ones(len(row), dtype=bool)
+        pos = np.frombuffer(self.tour.pos, dtype=np.intc)
+        m = min(len(pos), len(row))
+        outside[:m] = pos[:m] < 0
+        outside[u] = True
+        row[outside] = np.inf
+        k = min(self.k, len(row) - int(outside.sum()))
+        if k <= 0:
+            return []
+        nearest = np.argpartition(row, k - 1)[:k]
+        return nearest[np.argsort(row[nearest], kind="stable")].tolist()
+
+    def _add_candidate(self, v):
+        """
+        Give v its own list and put it into the list of every vertex it is
+        now one of the k nearest of. Returns those vertices.
+        """
+        candidates, dist = self.candidates, self.search.dist
+        candidates.extend([] for _ in range(len(candidates), v + 1))
+        candidates[v] = self._nearest(v)
+
+        row = np.asarray(self.graph.row(v), dtype=np.float64)
+        changed = []
+        for u in self.tour:
+            if u == v:
+                continue
+            c = candidates[u]
+            w = row[u]
+            if len(c) >= self.k and w >= dist(u, c[-1]):
+                continue
+            i = len(c)
+            while i > 0 and dist(u, c[i - 1]) > w:
+                i -= 1
+            c.insert(i, v)
+            del c[self.k:]
+            changed.append(u)
+        return changed
+
+    def _drop_candidate(self, v):
+        """Refill the lists that contained v from the remaining tour vertices; returns their owners."""
+        candidates = self.candidates
+        candidates[v] = []
+        changed = [u for u in self.tour if v in candidates[u]]
+        for u in changed:
+            candidates[u] = self._nearest(u)
+        return changed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Insert and drop stops on a solved tour, compared to solving again.")
+    parser.add_argument("-n", "--nodes", type=int, default=2000)
+    parser.add_argument("--updates", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    g = randomWeightedCompleteBulk(args.nodes, seed=args.seed, dtype=np.float64)
+    tour, _ = local_search(g, nearest_neighbor(g, 1), REPAIR_CHAIN)
+    repair = TourRepair(g, tour)
+    print(f"Nodes          : {args.nodes}")
+    print(f"Solved cost    : {repair.cost():.4f}")
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    for i in range(args.updates):
+        if i % 2 == 0:
+            repair.insert(coordinates=(rng.randint(0, 100), rng.randint(0, 100)))
+        else:
+            repair.remove(rng.choice(repair.tour.tolist()))
+    elapsed = time.perf_counter() - started
+    print(f"Repaired cost  : {repair.cost():.4f} ({args.updates} updates, {1000 * elapsed / args.updates:.2f} ms each)")
+
+    # The same stops solved from scratch on a rebuilt graph
+    stops = np.array([0] + sorted(repair.tour))
+    started = time.perf_counter()
+    h = WeightedGraph.from_array(np.ascontiguousarray(g.as_array()[np.ix_(stops, stops)]))
+    fresh, _ = local_search(h, nearest_neighbor(h, 1), REPAIR_CHAIN)
+    print(f"Resolved cost  : {tour_cost(h, fresh):.4f} ({time.perf_counter() - started:.2f}s)")
@@ -1,16 +1,50 @@
 import random
 import math
 
+import numpy as np
+
+from timeCost import edge_penalties, edge_penalty, travel_time, travel_times
+
+# Storage types accepted for the array-backed matrix
+ARRAY_DTYPES = (np.float32, np.float64)
+
+# Spare rows / columns reserved when add_node has to grow an array matrix,
+# as a fraction of its size (amortizes the copy to O(n) per vertex)
+ARRAY_GROWTH = 0.125
+
 class WeightedGraph:
-    def __init__(self, num_nodes):
+    def __init__(self, num_nodes, dtype=None, seed=1, coordinates=None):
+        """
+        dtype=None keeps the matrix as nested Python lists.
+        dtype=np.float32 / np.float64 stores it as one contiguous NumPy array
+        (4-8x smaller). Row and column 0 stay unused in both modes so
+        vertices 1..n index the matrix the same way.
+
+        seed reseeds the global random module before the coordinates are
+        drawn (None leaves it alone). coordinates={node: (x, y)} skips the
+        drawing and uses the given points instead. seed also keys the
+        per-edge penalties of edgeTimeCost (None counts as 0).
+        """
         self.num_nodes = num_nodes
-        # Initialize a 2D matrix with None
-        self.adj_matrix = [[0] * (num_nodes + 1) for _ in range(num_nodes + 1)]
+        self.seed = seed
+        self.dtype = None if dtype is None else np.dtype(dtype)
+        if self.dtype is None:
+            # Initialize a 2D matrix with 0
+            self.adj_matrix = [[0] * (num_nodes + 1) for _ in range(num_nodes + 1)]
+        elif self.dtype in ARRAY_DTYPES:
+            self.adj_matrix = np.zeros((num_nodes + 1, num_nodes + 1), dtype=self.dtype)
+        else:
+            raise ValueError(f"Unsupported matrix dtype: {self.dtype}")
 
         # Initialize a (x, y) coordinate for each vertex
         # This will be used to calcualte the distance
+        if coordinates is not None:
+            self.coordinates = dict(coordinates)
+            return
+
         self.coordinates = {}
-        random.seed(1)
+        if seed is not None:
+            random.seed(seed)
         for node in range(1, num_nodes + 1):
             x = random.randint(0, 100)
             y = random.randint(0, 100)
@@ -29,7 +63,67 @@ class WeightedGraph:
         self.adj_matrix[node1][node2] = 0
         self.adj_matrix[node2][node1] = 0
 
+    def add_node(self, coordinates=None, weights=None):
+        """
+        Add vertex n + 1 and return its label. Its edges come from weights
+        ({node: w}) when given, else from edgeTimeCost to every other
+        vertex using coordinates (x, y). O(n): list rows get one more cell
+        each, and array mode keeps ARRAY_GROWTH spare capacity for later
+        vertices, so it copies the matrix only once in a while.
+        Computing the weights needs coordinates for every vertex; graphs
+        without them (from_array, matrix files) must pass weights.
+        """
+        if weights is None and (coordinates is None or len(self.coordinates) < self.num_nodes):
+            raise ValueError("add_node needs weights= unless the new and all existing vertices have coordinates")
+        node = self.num_nodes + 1
+        if self.is_array():
+            self._grow(node + 1)
+        else:
+            for row in self.adj_matrix:
+                row.append(0)
+            self.adj_matrix.append([0] * (node + 1))
+        self.num_nodes = node
+
+        if coordinates is not None:
+            self.coordinates[node] = tuple(coordinates)
+        if weights is None:
+            # edgeTimeCost to every other vertex in one vectorized pass
+            x, y = self.coordinates[node]
+            labels = np.arange(1, node)
+            xy = np.array([self.coordinates[v] for v in range(1, node)], dtype=np.float64).reshape(-1, 2)
+            times = travel_times(xy[:, 0] - x, xy[:, 1] - y, edge_penalties(self.seed or 0, labels, node))
+            weights = dict(zip(labels.tolist(), times.tolist()))
+        for v, w in weights.items():
+            self.add_edge(v, node, w)
+        return node
+
+    def _grow(self, size):
+        # Make adj_matrix size x size, moving into a buffer with spare room
+        # when the current one is full; the cells past it stay 0
+        storage = getattr(self, "_storage", None)
+        if storage is None or storage.shape[0] < size:
+            room = size + max(1, int(size * ARRAY_GROWTH))
+            grown = np.zeros((room, room), dtype=self.dtype)
+            old = self.adj_matrix.shape[0]
+            grown[:old, :old] = self.adj_matrix
+            self._storage = storage = grown
+        self.adj_matrix = storage[:size, :size]
+
+    def remove_node(self, node):
+        """
+        Drop every edge of node with remove_edge. The label stays (its row
+        and column are all 0), so no other vertex is renumbered.
+        """
+        for v in range(1, self.num_nodes + 1):
+            self.remove_edge(node, v)
+
     def num_edges(self):
+        if self.is_array():
+            # Matrix is symmetric, so count nonzero cells above the diagonal
+            nonzero = np.count_nonzero(self.adj_matrix)
+            nonzero -= np.count_nonzero(np.diagonal(self.adj_matrix))
+            return int(nonzero // 2)
+
         num_edges = 0
         for i in range(self.num_nodes):
             for j in range(i+1, self.num_nodes + 1):
@@ -61,6 +155,53 @@ class WeightedGraph:
     def edge_exists(self, node1, node2):
         return self.adj_matrix[node1][node2] != 0
 
+    def weight(self, node1, node2):
+        # Same accessor as LazyWeightedGraph.weight
+        return self.adj_matrix[node1][node2]
+
+# ----------- Raw matrix access --------------
+
+    def is_array(self):
+        # True when adj_matrix is the contiguous NumPy buffer
+        return self.dtype is not None
+
+    def is_lazy(self):
+        # False here; LazyWeightedGraph computes weights on demand
+        return False
+
+    def as_array(self):
+        """
+        Return the (n+1) x (n+1) weight matrix as a NumPy array.
+        In array mode this is the raw buffer itself (no copy); in list mode
+        a float64 copy is built, so call it once per solve, not per lookup.
+        """
+        if self.is_array():
+            return self.adj_matrix
+        return np.array(self.adj_matrix, dtype=np.float64)
+
+    @classmethod
+    def from_array(cls, matrix, coordinates=None):
+        """
+        Wrap an existing padded (n+1) x (n+1) float32/float64 array as an
+        array-mode graph without copying it (e.g. a matrix mapped from
+        shared memory). coordinates defaults to an empty dict.
+        """
+        graph = cls.__new__(cls)
+        graph.num_nodes = matrix.shape[0] - 1
+        graph.dtype = np.dtype(matrix.dtype)
+        graph.seed = None
+        if graph.dtype not in ARRAY_DTYPES:
+            raise ValueError(f"Unsupported matrix dtype: {graph.dtype}")
+        graph.adj_matrix = matrix
+        graph.coordinates = {} if coordinates is None else dict(coordinates)
+        return graph
+
+    def row(self, node):
+        # Weights from node to every vertex (index 0 is padding)
+        if self.is_array():
+            return self.adj_matrix[node]
+        return np.array(self.adj_matrix[node], dtype=np.float64)
+
 # ------------ Distance formula ------------------
     def distanceCal(self, u, v):
         x1, y1 = self.coordinates[u]
@@ -75,16 +216,13 @@ class WeightedGraph:
         """
         Components:
         - Base time: from distance give speed a unit of time say 10 units of time
-        - Traffic penalty: picks a random number out of 0, 2, or 4 units of time
-        - Light penalty: another random selection between 0 to 3 with each adding 1.5 units of time
-        """
-        distance = self.distanceCal(u,v)
-        baseTime = distance / 10.0
-
-        trafficLevel = random.choice([0,1,2])
-        trafficPenalty = trafficLevel * 2.0
-
-        numLights = random.randint(0,3)
-        lightPenalty = numLights * 1.5
+        - Traffic penalty: 0, 2, or 4 units of time
+        - Light penalty: 0 to 3 lights, each adding 1.5 units of time
 
-        return round(baseTime + trafficPenalty + lightPenalty, 2)
+        The penalties are a pure function of (seed, edge) (see timeCost), so
+        the same edge always costs the same, whatever order it is asked in.
+        """
+        x1, y1 = self.coordinates[u]
+        x2, y2 = self.coordinates[v]
+        penalty = edge_penalty(self.seed or 0, u, v)
+        return travel_time(x2 - x1, y2 - y1, penalty)